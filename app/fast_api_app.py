@@ -12,6 +12,7 @@ import os
 import uuid
 import json
 import asyncio
+import logging
 from pathlib import Path
 from typing import Optional
 
@@ -31,11 +32,15 @@ from google.genai import types
 # Load environment
 load_dotenv()
 
+# Tool modules log through `logging`; show their progress lines on the console
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+
 # Import our agent
 from app.agent import root_agent
 
 # Import tools for direct use
 from tools.image_gen import extract_brand_colors
+from tools.intent_classifier import classify_intent, CAMPAIGN, SINGLE_POST
 
 # Base paths
 BASE_DIR = Path(__file__).parent.parent
@@ -115,6 +120,34 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+# Routing hints appended for messages the local classifier is confident about
+INTENT_HINTS = {
+    CAMPAIGN: "\n\n[Detected intent: CAMPAIGN → CampaignPlannerAgent]",
+    SINGLE_POST: "\n\n[Detected intent: SINGLE POST → IdeaSuggestionAgent]",
+}
+
+
+def active_agent_name(session) -> str:
+    """Name of the agent that will answer the next message (the last agent to reply)."""
+    for event in reversed(session.events):
+        if event.author != "user":
+            return event.author
+    return root_agent.name
+
+
+def add_intent_hint(message_text: str, user_message: str, session) -> str:
+    """
+    Tag the message with a pre-classified intent for the orchestrator.
+    
+    Only turns the orchestrator handles are tagged; follow-ups inside a
+    sub-agent's flow ("yes, now the post for Day 2") are left alone.
+    """
+    if active_agent_name(session) != root_agent.name:
+        return message_text
+    intent = classify_intent(user_message)
+    return message_text + INTENT_HINTS[intent] if intent else message_text
+
+
 # =============================================================================
 # Routes
 # =============================================================================
@@ -240,6 +273,7 @@ async def chat(request: ChatRequest):
                     colors = att["colors"]
                     attachment_context += f"\n  Brand colors extracted: Dominant={colors.get('dominant')}, Palette={colors.get('palette')}"
         message_text = message_text + attachment_context
+    message_text = add_intent_hint(message_text, request.message, session)
     
     # Create user message
     user_message = types.Content(
@@ -264,7 +298,7 @@ async def chat(request: ChatRequest):
     # Check for generated images in response
     # Parse response for image paths
     import re
-    image_pattern = r'/generated/[^\s\)\"\']+\.png'
+    image_pattern = r'/generated/[^\s\)\"\']+\.(?:png|jpe?g|webp)'
     found_images = re.findall(image_pattern, response_text)
     for img_path in found_images:
         generated_images.append({
@@ -327,6 +361,7 @@ async def chat_stream(request: ChatRequest):
                     print(f"📸 Reference images being sent to agent: {ref_paths}")
         message_text = message_text + attachment_context
         print(f"📝 Full message to agent:\n{message_text[:500]}...")
+    message_text = add_intent_hint(message_text, request.message, session)
     
     user_message = types.Content(
         role="user",
@@ -396,6 +431,12 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                         if att.get("colors"):
                             attachment_context += f" (Colors: {att['colors'].get('dominant')})"
                 message_text += attachment_context
+            session = await session_service.get_session(
+                app_name="content_studio",
+                user_id=user_id,
+                session_id=session_id
+            )
+            message_text = add_intent_hint(message_text, message, session)
             
             user_message = types.Content(
                 role="user",
@@ -460,12 +501,13 @@ async def delete_session(user_id: str, session_id: str):
 async def list_generated_images():
     """List all generated images."""
     images = []
-    for img_path in GENERATED_DIR.glob("*.png"):
-        images.append({
-            "filename": img_path.name,
-            "url": f"/generated/{img_path.name}",
-            "created": img_path.stat().st_mtime
-        })
+    for pattern in ("*.png", "*.jpg", "*.jpeg", "*.webp"):
+        for img_path in GENERATED_DIR.glob(pattern):
+            images.append({
+                "filename": img_path.name,
+                "url": f"/generated/{img_path.name}",
+                "created": img_path.stat().st_mtime
+            })
     # Sort by creation time, newest first
     images.sort(key=lambda x: x["created"], reverse=True)
     return {"images": images}
@@ -0,0 +1,23 @@
+"""Agent instruction prompts, stored as plain-text resources."""
+
+from functools import lru_cache
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).parent
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """
+    Load an agent instruction from `app/prompts/<name>.txt`.
+    
+    Each file is read once per process; edits to the text files
+    take effect on the next restart without touching the code.
+    
+    Args:
+        name: Prompt file name without the .txt extension
+        
+    Returns:
+        The prompt text
+    """
+    return (PROMPTS_DIR / f"{name}.txt").read_text(encoding="utf-8")
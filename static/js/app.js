@@ -1098,15 +1098,15 @@ class ContentStudioApp {
         if (!text) return '';
         
         // Process image links FIRST (before code blocks), handling various formats:
-        // - /generated/file.png
+        // - /generated/file.png (or .jpg/.jpeg/.webp)
         // - generated/file.png  
         // - `generated/file.png`
         // - `/generated/file.png`
         let formatted = text
             // Remove backticks around image paths first
-            .replace(/`((?:\/)?generated\/[^\s\`]+\.png)`/g, '$1')
+            .replace(/`((?:\/)?generated\/[^\s\`]+\.(?:png|jpe?g|webp))`/g, '$1')
             // Then convert image paths to clickable links
-            .replace(/(?:\/)?generated\/([^\s\<\>\"\'\)\`]+\.png)/g, '<a href="/generated/$1" class="image-link" data-image="/generated/$1">📷 View Image</a>');
+            .replace(/(?:\/)?generated\/([^\s\<\>\"\'\)\`]+\.(?:png|jpe?g|webp))/g, '<a href="/generated/$1" class="image-link" data-image="/generated/$1">📷 View Image</a>');
         
         // Then process other formatting
         return formatted
@@ -1496,7 +1496,7 @@ class ContentStudioApp {
                     const dayContent = weekContent.slice(dayStart, dayEnd);
                     
                     // Extract image path
-                    const imageMatch = dayContent.match(/(?:\/)?generated\/[^\s\)\"\'\`<>]+\.png/);
+                    const imageMatch = dayContent.match(/(?:\/)?generated\/[^\s\)\"\'\`<>]+\.(?:png|jpe?g|webp)/);
                     
                     // Extract caption
                     const captionMatch = dayContent.match(/caption[:\s]*\n?([\s\S]*?)(?=\n\n|hashtag|#[a-zA-Z]|$)/i);
@@ -1747,7 +1747,7 @@ class ContentStudioApp {
             });
         } else {
             // Fallback: Check for generated images without caption association
-            const imagePattern = /(?:\/)?generated\/[^\s\)\"\'\`<>]+\.png/g;
+            const imagePattern = /(?:\/)?generated\/[^\s\)\"\'\`<>]+\.(?:png|jpe?g|webp)/g;
             const matches = text.match(imagePattern);
             
             if (matches) {
@@ -1798,7 +1798,7 @@ class ContentStudioApp {
         const pairs = [];
         
         // Pattern 1: Day-based format (Day 1: ..., Image: ..., Caption: ...)
-        const dayPattern = /(?:Day\s*\d+|📸\s*Day\s*\d+)[^\n]*\n(?:.*?\n)*?.*?(?:Image|Generated)[^\n]*?(\/generated\/[^\s\)\"\'\`<>]+\.png)(?:.*?\n)*?(?:Caption|📝)[:\s]*\n?([\s\S]*?)(?=(?:Day\s*\d+|📸|Hashtags|#️⃣|\n---|\n\n\n|$))/gi;
+        const dayPattern = /(?:Day\s*\d+|📸\s*Day\s*\d+)[^\n]*\n(?:.*?\n)*?.*?(?:Image|Generated)[^\n]*?(\/generated\/[^\s\)\"\'\`<>]+\.(?:png|jpe?g|webp))(?:.*?\n)*?(?:Caption|📝)[:\s]*\n?([\s\S]*?)(?=(?:Day\s*\d+|📸|Hashtags|#️⃣|\n---|\n\n\n|$))/gi;
         
         let match;
         while ((match = dayPattern.exec(text)) !== null) {
@@ -1817,7 +1817,7 @@ class ContentStudioApp {
         
         // Pattern 2: Simple image + caption format
         if (pairs.length === 0) {
-            const simplePattern = /(?:(?:Here's|Generated|Created|Image)[^\n]*?(\/generated\/[^\s\)\"\'\`<>]+\.png))[\s\S]*?(?:Caption[:\s]*\n?([\s\S]*?)(?=\n\n|Hashtag|#️⃣|$))?/gi;
+            const simplePattern = /(?:(?:Here's|Generated|Created|Image)[^\n]*?(\/generated\/[^\s\)\"\'\`<>]+\.(?:png|jpe?g|webp)))[\s\S]*?(?:Caption[:\s]*\n?([\s\S]*?)(?=\n\n|Hashtag|#️⃣|$))?/gi;
             
             while ((match = simplePattern.exec(text)) !== null) {
                 const imagePath = match[1].startsWith('/') ? match[1] : '/' + match[1];
@@ -0,0 +1,43 @@
+"""Tests for the local single post / campaign pre-classifier."""
+
+import pytest
+
+from tools.intent_classifier import CAMPAIGN, SINGLE_POST, classify_intent
+
+
+@pytest.mark.parametrize("message", [
+    "Create a Valentine's Day post",
+    "Create a post for Diwali",
+    "Can you design an Instagram post for our launch?",
+    "make me a bold minimal post",
+    "I need a single post",
+    "just one post please",
+])
+def test_single_post_requests(message):
+    assert classify_intent(message) == SINGLE_POST
+
+
+@pytest.mark.parametrize("message", [
+    "Plan content for May",
+    "I need a content calendar for March",
+    "2 posts per week for the next 2 months",
+    "posts for the next 3 weeks",
+    "Let's run a Diwali campaign",
+])
+def test_campaign_requests(message):
+    assert classify_intent(message) == CAMPAIGN
+
+
+@pytest.mark.parametrize("message", [
+    # Follow-ups inside a campaign must not look like a new single post
+    "yes, now the post for Day 2",
+    "Day 1 approved, next post for Wednesday",
+    "regenerate: make it a bolder post",
+    # "may" as a verb, not the month
+    "the content for may be different",
+    # Both intents at once are left to the orchestrator
+    "Create a Valentine's Day post campaign",
+    "hello",
+])
+def test_ambiguous_messages_are_not_tagged(message):
+    assert classify_intent(message) == ""
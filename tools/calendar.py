@@ -1,66 +1,156 @@
 """Calendar and event planning tools for campaign planning."""
 
-import os
-from datetime import datetime, timedelta
-from typing import Any
+from datetime import date, datetime, timedelta
+from typing import Any, NamedTuple, Optional
 
-from google import genai
-from dotenv import load_dotenv
+from .client import generate_text, get_client
+from .llm_cache import cached_llm_call
 
-load_dotenv()
+
+# Days covered by each content calendar planning_period
+PLANNING_PERIOD_DAYS = {"week": 7, "month": 30, "quarter": 90}
+
+# Static prompt sections, built once instead of on every call
+UPCOMING_EVENTS_REQUEST = """
+
+For each event, provide:
+- Date
+- Event Name
+- Type (holiday/festival/awareness day/commercial)
+- Content Opportunity (how brands can leverage it)
+
+Include: Major holidays, awareness days, cultural events, seasonal themes, and commercial events.
+Format as a structured list."""
+
+CALENDAR_REQUEST = """
+
+**Create a calendar with:**
+1. Specific posting dates
+2. Content type for each post (Feed post, Reel idea, Story series, Carousel)
+3. Topic/Theme for each post
+4. Best posting time recommendation
+5. Caption hook idea
+6. Hashtag category to use
+
+**Content Mix Should Include:**
+- Educational content (how-to, tips)
+- Behind-the-scenes
+- User engagement posts (questions, polls)
+- Product/service highlights
+- Event-based content
+- Trending topic tie-ins
+
+Format as a structured weekly calendar."""
+
+POSTING_TIMES_REQUEST = """
+
+Provide:
+1. Best days of the week to post
+2. Optimal times for each recommended day
+3. Times to avoid
+4. Reasoning behind recommendations
+5. Tips for testing and optimizing
+
+Base recommendations on typical social media engagement patterns."""
+
+class Event(NamedTuple):
+    """A festival or observance in FESTIVALS_DB."""
+    date: str
+    name: str
+    type: str
+    themes: tuple[str, ...]
+    region: str = "global"
+    
+    def to_dict(self, **overrides: Any) -> dict:
+        """Tool-result form: themes as a list and no region for global events."""
+        data = self._asdict()
+        data["themes"] = list(self.themes)
+        if self.region == "global":
+            del data["region"]
+        data.update(overrides)
+        return data
 
 
 # Festival and event database
-FESTIVALS_DB = {
-    "january": [
-        {"date": "01", "name": "New Year's Day", "type": "holiday", "themes": ["new beginnings", "goals", "fresh start"]},
-        {"date": "14", "name": "Makar Sankranti", "type": "festival", "region": "India", "themes": ["harvest", "kites", "celebration"]},
-        {"date": "26", "name": "Republic Day", "type": "national", "region": "India", "themes": ["patriotism", "pride", "unity"]},
-    ],
-    "february": [
-        {"date": "14", "name": "Valentine's Day", "type": "observance", "themes": ["love", "relationships", "gifts"]},
-    ],
-    "march": [
-        {"date": "08", "name": "International Women's Day", "type": "awareness", "themes": ["empowerment", "equality", "women"]},
-        {"date": "variable", "name": "Holi", "type": "festival", "region": "India", "themes": ["colors", "celebration", "spring"]},
-    ],
-    "april": [
-        {"date": "22", "name": "Earth Day", "type": "awareness", "themes": ["environment", "sustainability", "nature"]},
-    ],
-    "may": [
-        {"date": "second_sunday", "name": "Mother's Day", "type": "observance", "themes": ["mothers", "gratitude", "family"]},
-    ],
-    "june": [
-        {"date": "third_sunday", "name": "Father's Day", "type": "observance", "themes": ["fathers", "gratitude", "family"]},
-        {"date": "21", "name": "International Yoga Day", "type": "awareness", "themes": ["wellness", "health", "mindfulness"]},
-    ],
-    "july": [
-        {"date": "04", "name": "Independence Day", "type": "national", "region": "US", "themes": ["freedom", "patriotism", "celebration"]},
-    ],
-    "august": [
-        {"date": "15", "name": "Independence Day", "type": "national", "region": "India", "themes": ["freedom", "patriotism", "pride"]},
-        {"date": "variable", "name": "Raksha Bandhan", "type": "festival", "region": "India", "themes": ["siblings", "bond", "love"]},
-    ],
-    "september": [
-        {"date": "05", "name": "Teachers' Day", "type": "observance", "region": "India", "themes": ["education", "gratitude", "teachers"]},
-    ],
-    "october": [
-        {"date": "02", "name": "Gandhi Jayanti", "type": "national", "region": "India", "themes": ["peace", "non-violence", "inspiration"]},
-        {"date": "variable", "name": "Dussehra/Navratri", "type": "festival", "region": "India", "themes": ["victory", "celebration", "tradition"]},
-        {"date": "31", "name": "Halloween", "type": "observance", "themes": ["costumes", "fun", "spooky"]},
-    ],
-    "november": [
-        {"date": "variable", "name": "Diwali", "type": "festival", "region": "India", "themes": ["lights", "prosperity", "celebration"]},
-        {"date": "fourth_thursday", "name": "Thanksgiving", "type": "holiday", "region": "US", "themes": ["gratitude", "family", "feast"]},
-        {"date": "last_friday", "name": "Black Friday", "type": "commercial", "themes": ["sales", "shopping", "deals"]},
-    ],
-    "december": [
-        {"date": "25", "name": "Christmas", "type": "holiday", "themes": ["gifts", "joy", "celebration", "family"]},
-        {"date": "31", "name": "New Year's Eve", "type": "holiday", "themes": ["celebration", "reflection", "party"]},
-    ]
+# "date" is a day of the month, a weekday rule ("second_sunday", "last_friday",
+# "day_after_fourth_thursday") or "variable" for lunar-calendar festivals
+FESTIVALS_DB: dict[str, tuple[Event, ...]] = {
+    "january": (
+        Event("01", "New Year's Day", "holiday", ("new beginnings", "goals", "fresh start")),
+        Event("14", "Makar Sankranti", "festival", ("harvest", "kites", "celebration"), region="India"),
+        Event("26", "Republic Day", "national", ("patriotism", "pride", "unity"), region="India"),
+    ),
+    "february": (
+        Event("14", "Valentine's Day", "observance", ("love", "relationships", "gifts")),
+    ),
+    "march": (
+        Event("08", "International Women's Day", "awareness", ("empowerment", "equality", "women")),
+        Event("variable", "Holi", "festival", ("colors", "celebration", "spring"), region="India"),
+    ),
+    "april": (
+        Event("22", "Earth Day", "awareness", ("environment", "sustainability", "nature")),
+    ),
+    "may": (
+        Event("second_sunday", "Mother's Day", "observance", ("mothers", "gratitude", "family")),
+    ),
+    "june": (
+        Event("third_sunday", "Father's Day", "observance", ("fathers", "gratitude", "family")),
+        Event("21", "International Yoga Day", "awareness", ("wellness", "health", "mindfulness")),
+    ),
+    "july": (
+        Event("04", "Independence Day", "national", ("freedom", "patriotism", "celebration"), region="US"),
+    ),
+    "august": (
+        Event("15", "Independence Day", "national", ("freedom", "patriotism", "pride"), region="India"),
+        Event("variable", "Raksha Bandhan", "festival", ("siblings", "bond", "love"), region="India"),
+    ),
+    "september": (
+        Event("05", "Teachers' Day", "observance", ("education", "gratitude", "teachers"), region="India"),
+    ),
+    "october": (
+        Event("02", "Gandhi Jayanti", "national", ("peace", "non-violence", "inspiration"), region="India"),
+        Event("variable", "Dussehra/Navratri", "festival", ("victory", "celebration", "tradition"), region="India"),
+        Event("31", "Halloween", "observance", ("costumes", "fun", "spooky")),
+    ),
+    "november": (
+        Event("variable", "Diwali", "festival", ("lights", "prosperity", "celebration"), region="India"),
+        Event("fourth_thursday", "Thanksgiving", "holiday", ("gratitude", "family", "feast"), region="US"),
+        Event("day_after_fourth_thursday", "Black Friday", "commercial", ("sales", "shopping", "deals")),
+    ),
+    "december": (
+        Event("25", "Christmas", "holiday", ("gifts", "joy", "celebration", "family")),
+        Event("31", "New Year's Eve", "holiday", ("celebration", "reflection", "party")),
+    ),
 }
 
 
+def _build_event_indexes() -> tuple[dict, dict]:
+    """
+    Precompute events and content themes per (month, region).
+    
+    "global" maps to every event in the month; a named region maps to its own
+    events plus the untagged ones; "" holds only the untagged events, used for
+    regions without dedicated entries.
+    """
+    events_index = {}
+    themes_index = {}
+    for month, events in FESTIVALS_DB.items():
+        untagged = tuple(e for e in events if e.region == "global")
+        events_index[(month, "global")] = tuple(events)
+        events_index[(month, "")] = untagged
+        for region in {e.region for e in events} - {"global"}:
+            events_index[(month, region)] = tuple(
+                e for e in events if e.region in (region, "global")
+            )
+    for key, events in events_index.items():
+        # dict.fromkeys keeps first-seen order so theme lists are deterministic
+        themes_index[key] = tuple(dict.fromkeys(theme for e in events for theme in e.themes))
+    return events_index, themes_index
+
+
+_EVENTS_INDEX, _THEMES_INDEX = _build_event_indexes()
+
+
 def get_festivals_and_events(
     month: str = "",
     region: str = "global",
@@ -82,81 +172,159 @@ def get_festivals_and_events(
     else:
         month = month.lower()
     
-    events = FESTIVALS_DB.get(month, [])
-    
-    # Filter by region if specified
-    if region != "global":
-        events = [e for e in events if e.get("region", "global") in [region, "global"] or "region" not in e]
+    # Unknown regions only see the events that aren't tied to a region
+    key = (month, region) if (month, region) in _EVENTS_INDEX else (month, "")
+    events = _EVENTS_INDEX.get(key, ())
     
     result = {
         "status": "success",
         "month": month.title(),
         "region": region,
-        "events": events,
+        "events": [e.to_dict() for e in events],
         "count": len(events)
     }
     
     if include_themes and events:
-        all_themes = []
-        for event in events:
-            all_themes.extend(event.get("themes", []))
-        result["content_themes"] = list(set(all_themes))
+        result["content_themes"] = list(_THEMES_INDEX[key])
     
     return result
 
 
+# Lunar-calendar festivals move every year: name -> {year: (month, day)}
+LUNAR_FESTIVAL_DATES = {
+    "Holi": {2025: (3, 14), 2026: (3, 4), 2027: (3, 22)},
+    "Raksha Bandhan": {2025: (8, 9), 2026: (8, 28), 2027: (8, 17)},
+    "Dussehra/Navratri": {2025: (10, 2), 2026: (10, 20), 2027: (10, 9)},
+    "Diwali": {2025: (10, 20), 2026: (11, 8), 2027: (10, 29)},
+}
+
+WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+
+def _resolve_date(rule: str, year: int, month: int) -> Optional[date]:
+    """Resolve a fixed-day or weekday FESTIVALS_DB date rule to a date in the given month."""
+    if rule.isdigit():
+        return date(year, month, int(rule))
+    if rule.startswith("day_after_"):
+        day = _resolve_date(rule[len("day_after_"):], year, month)
+        return day + timedelta(days=1) if day else None
+    
+    which, _, weekday_name = rule.partition("_")
+    weekday = WEEKDAYS.get(weekday_name)
+    if weekday is None:
+        return None
+    if which == "last":
+        next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        last_day = next_month - timedelta(days=1)
+        return last_day - timedelta(days=(last_day.weekday() - weekday) % 7)
+    if which not in ORDINALS:
+        return None
+    first_day = date(year, month, 1)
+    return first_day + timedelta(days=(weekday - first_day.weekday()) % 7 + 7 * (ORDINALS[which] - 1))
+
+
+def _events_in_window(start: date, end: date, region: str) -> Optional[list[dict]]:
+    """
+    Collect FESTIVALS_DB events dated between start and end (inclusive).
+    
+    Returns:
+        Events with ISO dates sorted by date, or None if a lunar festival in
+        the window falls in a year missing from LUNAR_FESTIVAL_DATES
+    """
+    events = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        month_name = date(year, month, 1).strftime("%B").lower()
+        key = (month_name, region) if (month_name, region) in _EVENTS_INDEX else (month_name, "")
+        for event in _EVENTS_INDEX.get(key, ()):
+            if event.date == "variable":
+                # Known years are added below, wherever the festival falls that year
+                if year not in LUNAR_FESTIVAL_DATES.get(event.name, {}):
+                    return None
+                continue
+            day = _resolve_date(event.date, year, month)
+            if day is None:
+                return None
+            if start <= day <= end:
+                events.append(event.to_dict(date=day.isoformat()))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    for month_events in FESTIVALS_DB.values():
+        for event in month_events:
+            if event.date != "variable":
+                continue
+            if region != "global" and event.region not in (region, "global"):
+                continue
+            for year, (month, day_of_month) in LUNAR_FESTIVAL_DATES.get(event.name, {}).items():
+                day = date(year, month, day_of_month)
+                if start <= day <= end:
+                    events.append(event.to_dict(date=day.isoformat()))
+    
+    events.sort(key=lambda e: e["date"])
+    return events
+
+
+@cached_llm_call
 def get_upcoming_events(
     days_ahead: int = 30,
-    region: str = "global"
+    region: str = "global",
+    force_llm: bool = False
 ) -> dict:
     """
     Get upcoming events within a specified number of days.
     
+    Events come from the built-in festival database, with weekday rules and
+    known lunar festival dates resolved locally; Gemini is only asked when the
+    window reaches a lunar festival in a year without a known date.
+    
     Args:
         days_ahead: Number of days to look ahead
         region: Geographic region filter
+        force_llm: Always ask Gemini (broader coverage incl. awareness days)
         
     Returns:
         Dictionary with upcoming events
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        return {"status": "error", "message": "No API key found"}
-    
-    client = genai.Client(api_key=api_key)
-    
     start_date = datetime.now()
     end_date = start_date + timedelta(days=days_ahead)
     
+    if not force_llm:
+        events = _events_in_window(start_date.date(), end_date.date(), region)
+        if events is not None:
+            return {
+                "status": "success",
+                "start_date": start_date.strftime('%Y-%m-%d'),
+                "end_date": end_date.strftime('%Y-%m-%d'),
+                "region": region,
+                "source": "calendar",
+                "events": events,
+                "count": len(events)
+            }
+    
+    client = get_client()
+    if client is None:
+        return {"status": "error", "message": "No API key found"}
+    
     prompt = f"""List important events, holidays, and observances from {start_date.strftime('%B %d, %Y')} to {end_date.strftime('%B %d, %Y')}.
 
-Region Focus: {region}
-
-For each event, provide:
-- Date
-- Event Name
-- Type (holiday/festival/awareness day/commercial)
-- Content Opportunity (how brands can leverage it)
-
-Include: Major holidays, awareness days, cultural events, seasonal themes, and commercial events.
-Format as a structured list."""
+Region Focus: {region}{UPCOMING_EVENTS_REQUEST}"""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        text = generate_text(client, prompt)
         return {
             "status": "success",
             "start_date": start_date.strftime('%Y-%m-%d'),
             "end_date": end_date.strftime('%Y-%m-%d'),
             "region": region,
-            "events": response.text.strip()
+            "source": "llm",
+            "events": text
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+@cached_llm_call
 def get_content_calendar_suggestions(
     brand_name: str,
     niche: str = "general",
@@ -179,22 +347,19 @@ def get_content_calendar_suggestions(
     Returns:
         Dictionary with content calendar
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
-    days_map = {"week": 7, "month": 30, "quarter": 90}
-    days = days_map.get(planning_period, 30)
+    days = PLANNING_PERIOD_DAYS.get(planning_period, 30)
     
     start_date = datetime.now()
     end_date = start_date + timedelta(days=days)
     
     # Get events for context
     current_month = start_date.strftime("%B").lower()
-    events = FESTIVALS_DB.get(current_month, [])
-    events_str = ", ".join([e["name"] for e in events]) if events else "No major events"
+    events = FESTIVALS_DB.get(current_month, ())
+    events_str = ", ".join([e.name for e in events]) if events else "No major events"
     
     audience = target_audience
     
@@ -208,31 +373,10 @@ def get_content_calendar_suggestions(
 **Planning Period:** {start_date.strftime('%B %d')} to {end_date.strftime('%B %d, %Y')}
 **Target:** {posts_per_week} posts per week
 
-**Relevant Events This Period:** {events_str}
-
-**Create a calendar with:**
-1. Specific posting dates
-2. Content type for each post (Feed post, Reel idea, Story series, Carousel)
-3. Topic/Theme for each post
-4. Best posting time recommendation
-5. Caption hook idea
-6. Hashtag category to use
-
-**Content Mix Should Include:**
-- Educational content (how-to, tips)
-- Behind-the-scenes
-- User engagement posts (questions, polls)
-- Product/service highlights
-- Event-based content
-- Trending topic tie-ins
-
-Format as a structured weekly calendar."""
+**Relevant Events This Period:** {events_str}{CALENDAR_REQUEST}"""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        text = generate_text(client, prompt)
         return {
             "status": "success",
             "brand": brand_name,
@@ -240,12 +384,13 @@ Format as a structured weekly calendar."""
             "start_date": start_date.strftime('%Y-%m-%d'),
             "end_date": end_date.strftime('%Y-%m-%d'),
             "posts_per_week": posts_per_week,
-            "calendar": response.text.strip()
+            "calendar": text
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+@cached_llm_call
 def suggest_best_posting_times(
     niche: str,
     target_audience: str = "",
@@ -262,37 +407,23 @@ def suggest_best_posting_times(
     Returns:
         Dictionary with posting time recommendations
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
     prompt = f"""Recommend optimal Instagram posting times for:
 
 **Niche:** {niche}
 **Target Audience:** {target_audience or "General audience"}
-**Timezone:** {timezone}
-
-Provide:
-1. Best days of the week to post
-2. Optimal times for each recommended day
-3. Times to avoid
-4. Reasoning behind recommendations
-5. Tips for testing and optimizing
-
-Base recommendations on typical social media engagement patterns."""
+**Timezone:** {timezone}{POSTING_TIMES_REQUEST}"""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        text = generate_text(client, prompt)
         return {
             "status": "success",
             "niche": niche,
             "timezone": timezone,
-            "recommendations": response.text.strip()
+            "recommendations": text
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,102 @@
+"""Shared Gemini client for the tool modules."""
+
+import os
+import threading
+from typing import Iterator, Optional
+
+from google import genai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Settings are read from the environment once at import; see reload_env()
+API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gemini-2.5-flash")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini-embedding-001")
+IMAGE_MODEL = os.getenv("IMAGE_MODEL", "gemini-3-pro-image-preview")
+EDIT_MODEL = os.getenv("EDIT_MODEL", IMAGE_MODEL)
+VIDEO_MODEL = os.getenv("VIDEO_MODEL", "veo-2.0-generate-001")
+
+_client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+
+def reload_env() -> None:
+    """
+    Re-read the API key and model settings from .env and the environment.
+
+    The shared client is dropped so the next get_client() call uses the new key.
+    """
+    global API_KEY, DEFAULT_MODEL, EMBEDDING_MODEL, IMAGE_MODEL, EDIT_MODEL, VIDEO_MODEL, _client
+    load_dotenv(override=True)
+    with _client_lock:
+        API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gemini-2.5-flash")
+        EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini-embedding-001")
+        IMAGE_MODEL = os.getenv("IMAGE_MODEL", "gemini-3-pro-image-preview")
+        EDIT_MODEL = os.getenv("EDIT_MODEL", IMAGE_MODEL)
+        VIDEO_MODEL = os.getenv("VIDEO_MODEL", "veo-2.0-generate-001")
+        _client = None
+
+
+def get_client() -> Optional[genai.Client]:
+    """
+    Get the process-wide Gemini client, creating it on first use.
+
+    Reusing one client keeps its HTTP connection pool warm instead of paying
+    a fresh TLS handshake on every tool call.
+
+    Returns:
+        The shared client, or None if no API key is configured
+    """
+    global _client
+    if _client is None and API_KEY:
+        with _client_lock:
+            if _client is None:
+                _client = genai.Client(api_key=API_KEY)
+    return _client
+
+
+def stream_text(client: genai.Client, prompt: str) -> Iterator[str]:
+    """
+    Stream a text completion from the default model.
+
+    Args:
+        client: Client from get_client()
+        prompt: Prompt to send
+
+    Yields:
+        Non-empty pieces of the response text as they arrive
+    """
+    for chunk in client.models.generate_content_stream(model=DEFAULT_MODEL, contents=prompt):
+        if chunk.text:
+            yield chunk.text
+
+
+def generate_text(client: genai.Client, prompt: str) -> str:
+    """
+    Get a full text completion from the default model.
+
+    Args:
+        client: Client from get_client()
+        prompt: Prompt to send
+
+    Returns:
+        The streamed pieces joined and stripped once at the end
+    """
+    return "".join(stream_text(client, prompt)).strip()
+
+
+def embed_text(client: genai.Client, text: str) -> list[float]:
+    """
+    Embed a piece of text with the embedding model.
+
+    Args:
+        client: Client from get_client()
+        text: Text to embed
+
+    Returns:
+        Embedding vector
+    """
+    result = client.models.embed_content(model=EMBEDDING_MODEL, contents=text)
+    return list(result.embeddings[0].values)
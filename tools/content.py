@@ -1,14 +1,92 @@
 """Content creation tools for captions and hashtags."""
 
-import os
-from typing import Any
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
 
-from google import genai
-from dotenv import load_dotenv
+from google.adk.tools.tool_context import ToolContext
 
-load_dotenv()
+from .client import generate_text, get_client, stream_text
+from .image_gen import generate_post_image
+from .llm_cache import cached_llm_call, semantic_llm_call
 
 
+# Prompt line for each caption emoji_level
+EMOJI_INSTRUCTIONS = {
+    "none": "Do not use any emojis.",
+    "minimal": "Use 1-2 emojis strategically.",
+    "moderate": "Use 3-5 emojis to enhance the message.",
+    "heavy": "Use emojis liberally throughout."
+}
+DEFAULT_EMOJI_INSTRUCTION = "Use emojis moderately."
+
+# Session state key holding post cards waiting to be shown in the chat
+POST_CARDS_STATE_KEY = "campaign_post_cards"
+
+# Static prompt sections, built once instead of on every call
+CAPTION_RULES_TEMPLATE = """
+
+**CRITICAL REQUIREMENTS - KEEP IT SHORT:**
+- Total length: 50-150 words MAXIMUM (around 3-5 sentences)
+- First line = attention-grabbing HOOK
+- 1-2 sentences of core message
+- End with ONE clear call-to-action
+- {emoji_instruction}
+- Easy to copy-paste to Instagram
+
+**FORMAT:**
+[Hook line]
+
+[1-2 sentences of value]
+
+[Simple CTA] 👇
+
+**DON'T:**
+- Write long paragraphs
+- Exceed 150 words
+- Be overly promotional
+- Use too many emojis
+
+Write ONLY the caption text, nothing else:"""
+CAPTION_RULES = {
+    level: CAPTION_RULES_TEMPLATE.format(emoji_instruction=instruction)
+    for level, instruction in EMOJI_INSTRUCTIONS.items()
+}
+DEFAULT_CAPTION_RULES = CAPTION_RULES_TEMPLATE.format(emoji_instruction=DEFAULT_EMOJI_INSTRUCTION)
+
+HASHTAG_STRATEGY = """
+
+**Hashtag Strategy:**
+- Mix of high-volume (1M+ posts) and niche-specific tags
+- Include 2-3 branded hashtags if brand name provided
+- Add relevant trending hashtags
+- Include community hashtags
+- Mix different reach levels for optimal discovery
+
+Return ONLY hashtags, one per line, each starting with #:"""
+
+IMPROVE_INSTRUCTIONS_TEMPLATE = """
+
+**Instructions:**
+- {tone_instruction}
+- Keep it engaging and authentic
+- Ensure it's still suitable for Instagram
+- Apply the requested changes thoughtfully
+
+Write ONLY the improved caption, nothing else:"""
+IMPROVE_INSTRUCTIONS = {
+    True: IMPROVE_INSTRUCTIONS_TEMPLATE.format(tone_instruction="Maintain the same overall tone and voice"),
+    False: IMPROVE_INSTRUCTIONS_TEMPLATE.format(tone_instruction="Adjust tone as needed"),
+}
+
+# Leading hashtag of each line in a generate_hashtags response
+HASHTAG_LINE = re.compile(r"^[ \t]*(#\w+)", re.MULTILINE)
+
+
+@cached_llm_call
+@semantic_llm_call(varying=("topic", "key_message", "occasion", "image_description"))
 def write_caption(
     topic: str,
     brand_voice: str = "professional yet friendly",
@@ -21,7 +99,8 @@ def write_caption(
     emoji_level: str = "moderate",
     company_overview: str = "",
     brand_name: str = "",
-    image_description: str = ""
+    image_description: str = "",
+    force: bool = False
 ) -> dict:
     """
     Write an engaging Instagram caption.
@@ -39,22 +118,16 @@ def write_caption(
         company_overview: Description of what the company does (for context)
         brand_name: Name of the brand
         image_description: Description of the image this caption is for
+        force: Write a new caption even if this exact request was made before
         
     Returns:
         Dictionary with generated caption
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
-    emoji_instruction = {
-        "none": "Do not use any emojis.",
-        "minimal": "Use 1-2 emojis strategically.",
-        "moderate": "Use 3-5 emojis to enhance the message.",
-        "heavy": "Use emojis liberally throughout."
-    }.get(emoji_level, "Use emojis moderately.")
+    caption_rules = CAPTION_RULES.get(emoji_level, DEFAULT_CAPTION_RULES)
     
     # Build company context
     company_context = ""
@@ -75,37 +148,10 @@ def write_caption(
 **Target Audience:** {target_audience}
 **Key Message:** {key_message or "Engage and connect with the audience"}
 **Occasion:** {occasion or "Regular post"}
-**Tone:** {tone}{company_context}{image_context}
-
-**CRITICAL REQUIREMENTS - KEEP IT SHORT:**
-- Total length: 50-150 words MAXIMUM (around 3-5 sentences)
-- First line = attention-grabbing HOOK
-- 1-2 sentences of core message
-- End with ONE clear call-to-action
-- {emoji_instruction}
-- Easy to copy-paste to Instagram
-
-**FORMAT:**
-[Hook line]
-
-[1-2 sentences of value]
-
-[Simple CTA] 👇
-
-**DON'T:**
-- Write long paragraphs
-- Exceed 150 words
-- Be overly promotional
-- Use too many emojis
-
-Write ONLY the caption text, nothing else:"""
+**Tone:** {tone}{company_context}{image_context}{caption_rules}"""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
-        caption = response.text.strip()
+        caption = generate_text(client, prompt)
         return {
             "status": "success",
             "caption": caption,
@@ -117,12 +163,15 @@ Write ONLY the caption text, nothing else:"""
         return {"status": "error", "message": str(e)}
 
 
+@cached_llm_call
+@semantic_llm_call(varying=("topic", "trending_context"))
 def generate_hashtags(
     topic: str,
     niche: str = "",
     brand_name: str = "",
     trending_context: str = "",
-    max_hashtags: int = 30
+    max_hashtags: int = 30,
+    force: bool = False
 ) -> dict:
     """
     Generate relevant hashtags for an Instagram post.
@@ -133,50 +182,38 @@ def generate_hashtags(
         brand_name: Brand name for branded hashtag
         trending_context: Any trending topics to incorporate
         max_hashtags: Maximum number of hashtags
+        force: Write a new set of hashtags even if this exact request was made before
         
     Returns:
         Dictionary with hashtags
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
     prompt = f"""Generate {max_hashtags} strategic Instagram hashtags for a post about:
 
 **Topic:** {topic}
 **Niche/Industry:** {niche or "general"}
 **Brand Name:** {brand_name or "N/A"}
-**Trending Context:** {trending_context or "None specified"}
-
-**Hashtag Strategy:**
-- Mix of high-volume (1M+ posts) and niche-specific tags
-- Include 2-3 branded hashtags if brand name provided
-- Add relevant trending hashtags
-- Include community hashtags
-- Mix different reach levels for optimal discovery
-
-Return ONLY hashtags, one per line, each starting with #:"""
+**Trending Context:** {trending_context or "None specified"}{HASHTAG_STRATEGY}"""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        # Parse hashtags as complete lines stream in and stop once we have enough;
+        # a line split across chunks is carried over to the next one
+        found = {}
+        pending = ""
+        for piece in stream_text(client, prompt):
+            complete, _, pending = (pending + piece).rpartition("\n")
+            for tag in HASHTAG_LINE.findall(complete):
+                found.setdefault(tag)
+            if len(found) >= max_hashtags:
+                break
+        for tag in HASHTAG_LINE.findall(pending):
+            found.setdefault(tag)
         
-        # Parse hashtags from response
-        hashtags = []
-        for line in response.text.strip().split("\n"):
-            line = line.strip()
-            if line.startswith("#"):
-                # Clean up the hashtag
-                tag = ''.join(c for c in line.split()[0] if c.isalnum() or c == '#')
-                if tag and tag != "#":
-                    hashtags.append(tag)
-        
-        # Remove duplicates while preserving order
-        hashtags = list(dict.fromkeys(hashtags))[:max_hashtags]
+        # dict keys keep first-seen order, so duplicates are already gone
+        hashtags = list(found)[:max_hashtags]
         
         return {
             "status": "success",
@@ -189,10 +226,12 @@ Return ONLY hashtags, one per line, each starting with #:"""
         return {"status": "error", "message": str(e)}
 
 
+@cached_llm_call
 def improve_caption(
     original_caption: str,
     feedback: str,
-    preserve_tone: bool = True
+    preserve_tone: bool = True,
+    force: bool = False
 ) -> dict:
     """
     Improve an existing caption based on feedback.
@@ -201,38 +240,25 @@ def improve_caption(
         original_caption: The current caption
         feedback: What changes to make
         preserve_tone: Keep the same overall tone
+        force: Write a new version even if this exact request was made before
         
     Returns:
         Dictionary with improved caption
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
     prompt = f"""Improve this Instagram caption based on the feedback:
 
 **Original Caption:**
 {original_caption}
 
 **Feedback/Changes Requested:**
-{feedback}
-
-**Instructions:**
-- {"Maintain the same overall tone and voice" if preserve_tone else "Adjust tone as needed"}
-- Keep it engaging and authentic
-- Ensure it's still suitable for Instagram
-- Apply the requested changes thoughtfully
-
-Write ONLY the improved caption, nothing else:"""
+{feedback}{IMPROVE_INSTRUCTIONS[preserve_tone]}"""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
-        improved = response.text.strip()
+        improved = generate_text(client, prompt)
         return {
             "status": "success",
             "improved_caption": improved,
@@ -243,13 +269,15 @@ Write ONLY the improved caption, nothing else:"""
         return {"status": "error", "message": str(e)}
 
 
+@cached_llm_call
 def create_complete_post(
     topic: str,
     brand_name: str = "",
     brand_voice: str = "professional",
     niche: str = "",
     occasion: str = "",
-    include_hashtags: bool = True
+    include_hashtags: bool = True,
+    force: bool = False
 ) -> dict:
     """
     Create a complete post with caption and hashtags.
@@ -261,17 +289,32 @@ def create_complete_post(
         niche: Industry/niche
         occasion: Special occasion
         include_hashtags: Whether to include hashtags
+        force: Write a new caption and hashtags even if this exact request was made before
         
     Returns:
         Dictionary with complete post content
     """
-    # Generate caption
-    caption_result = write_caption(
-        topic=topic,
-        brand_voice=brand_voice,
-        occasion=occasion,
-        include_cta=True
-    )
+    # Caption and hashtags don't depend on each other - run both Gemini calls at once
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        caption_future = executor.submit(
+            write_caption,
+            topic=topic,
+            brand_voice=brand_voice,
+            occasion=occasion,
+            include_cta=True,
+            force=force
+        )
+        hashtag_future = None
+        if include_hashtags:
+            hashtag_future = executor.submit(
+                generate_hashtags,
+                topic=topic,
+                niche=niche,
+                brand_name=brand_name,
+                force=force
+            )
+        caption_result = caption_future.result()
+        hashtag_result = hashtag_future.result() if hashtag_future else None
     
     if caption_result["status"] != "success":
         return caption_result
@@ -282,14 +325,7 @@ def create_complete_post(
         "caption_length": caption_result["character_count"]
     }
     
-    # Generate hashtags if requested
-    if include_hashtags:
-        hashtag_result = generate_hashtags(
-            topic=topic,
-            niche=niche,
-            brand_name=brand_name
-        )
-        
+    if hashtag_result is not None:
         if hashtag_result["status"] == "success":
             result["hashtags"] = hashtag_result["hashtags"]
             result["hashtag_string"] = hashtag_result["hashtag_string"]
@@ -300,3 +336,107 @@ def create_complete_post(
         result["full_post"] = caption_result["caption"]
     
     return result
+
+
+def _as_result(outcome: Any) -> dict:
+    """A tool result, with a raised exception turned into an error result."""
+    if isinstance(outcome, Exception):
+        return {"status": "error", "message": str(outcome)}
+    return outcome
+
+
+async def create_complete_posts(posts: list[dict], max_concurrency: int = 8) -> list[dict]:
+    """
+    Create several complete posts at once, each with its caption, hashtags and optional image.
+    
+    Every post's text and image requests run side by side, and posts run
+    concurrently up to max_concurrency, so a batch takes about as long as its
+    slowest posts rather than the sum of every request.
+    
+    Args:
+        posts: create_complete_post keyword arguments, one dict per post, plus an
+            optional "image" dict of generate_post_image keyword arguments
+        max_concurrency: Most posts being generated at once
+        
+    Returns:
+        One result dictionary per post, in the same order; posts with an image
+        request carry its generate_post_image result under "image", even when
+        the text side failed
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def create(post: dict) -> dict:
+        post = dict(post)
+        image_request = post.pop("image", None)
+        async with semaphore:
+            # The text tools are synchronous (and cached), so they run on a worker thread
+            text = asyncio.to_thread(create_complete_post, **post)
+            if image_request is None:
+                return await text
+            # Either side failing keeps the other's result, so a finished image isn't thrown away
+            result, image = map(_as_result, await asyncio.gather(
+                text, generate_post_image(**image_request), return_exceptions=True
+            ))
+        return dict(result, image=image)
+    
+    results = await asyncio.gather(*(create(post) for post in posts), return_exceptions=True)
+    # A bad post (e.g. a missing topic) fails on its own instead of sinking the batch
+    return [_as_result(result) for result in results]
+
+
+def _post_card(result: dict) -> str:
+    """Render a campaign_post_result as the post card shown in the chat."""
+    day, total = result["day"], result["total"]
+    lines = [f"📸 **Day {day} of {total}**", "", f"🖼️ Image: {result['image']}"]
+    if result["headline"]:
+        lines += ["", f"**{result['headline']}**"]
+    # "Caption:" and the separator bracket the caption for the UI's image/caption
+    # pairing, which needs some caption text between them
+    caption = result["blurb"] or result["headline"]
+    lines += ["", "Caption:", caption, "", "---", f"✅ Approve Day {day}? (yes/regenerate/modify)"]
+    if day < total:
+        lines.append(f"➡️ Next up: Day {day + 1} of {total}")
+    return "\n".join(lines)
+
+
+def campaign_post_result(
+    day: int,
+    total: int,
+    headline: str,
+    image: str,
+    blurb: str = "",
+    tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Report a generated campaign post in a compact, structured form.
+    
+    The post card is rendered from this and shown in the chat once the agent
+    finishes its turn, so agents call it once per post instead of writing the
+    card out as text.
+    
+    Args:
+        day: Day number of this post within the current week (1-based)
+        total: Total number of posts planned for the current week
+        headline: Headline text shown on the image
+        image: Path of the generated image
+        blurb: Caption and hashtags for the post
+        
+    Returns:
+        Dictionary with the structured post result
+    """
+    if not image.startswith("/generated/"):
+        # Accept the image_path or filename from generate_post_image as well as its url
+        image = f"/generated/{Path(image).name}"
+    
+    result = {
+        "status": "success",
+        "day": day,
+        "total": total,
+        "headline": headline,
+        "image": image,
+        "blurb": blurb
+    }
+    if tool_context is not None:
+        cards = tool_context.state.get(POST_CARDS_STATE_KEY) or []
+        tool_context.state[POST_CARDS_STATE_KEY] = cards + [_post_card(result)]
+    return result
@@ -1,24 +1,362 @@
 """Image generation tools using Gemini API."""
 
+import asyncio
+import inspect
+import io
+import logging
 import os
-import uuid
+import random
+import re
+import secrets
+import time
+import weakref
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable, Callable, Optional
 
-from google import genai
-from google.genai import types
+import httpx
+from google.genai import errors, types
 from PIL import Image
-from colorthief import ColorThief
-from dotenv import load_dotenv
 
-load_dotenv()
+from . import client as gemini
+from .client import get_client
+from .llm_cache import LLMCache, get_llm_cache, register_cache
+from .rate_limit import ConcurrencyLimit, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Shared workers for blocking image work (decoding, colour extraction, file writes); PIL releases
+# the GIL while decoding. The async tools run all such work here, which also caps the thread count.
+IMAGE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="image")
+
+# Logos and reference images are only guidance for the model, which downsizes them anyway
+API_IMAGE_MAX_EDGE = 512
+
+# Image formats the API takes as-is (by PIL format name), so small files skip the decode/re-encode
+UPLOAD_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+# JPEG quality for full-size images we have to re-encode ourselves (the SDK would use 75)
+UPLOAD_JPEG_QUALITY = 90
+
+# API-sized images still held by an in-flight request, so concurrent posts sharing a logo
+# or reference (e.g. a batch of variants) decode it once. Entries go when the last user does.
+API_IMAGE_CACHE: "weakref.WeakValueDictionary[tuple, Image.Image]" = weakref.WeakValueDictionary()
+
+# Most reference colours quoted in the post prompt
+MAX_REFERENCE_COLORS = 6
+
+# Longest edge images are sampled down to before quantizing; the palette doesn't change above this
+PALETTE_SAMPLE_EDGE = 200
+
+# Most images generate_post_image asks for in one request (candidate_count)
+MAX_IMAGES_PER_REQUEST = 8
+
+# Leading bytes of the image formats we save, checked before trusting the model's output
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+# Output directories already created by this process, so saves skip the mkdir
+CREATED_DIRS: set[str] = set()
+
+# Recent generate_post_image results, so resubmitting the same request reuses the image.
+# Written through to the LLM cache's SQLite file (LLM_CACHE_PATH), so hits survive restarts,
+# and registered so llm_cache.invalidate_all() clears it along with the text results.
+POST_RESULT_CACHE = register_cache(LLMCache(maxsize=64, disk=get_llm_cache().disk))
+
+# Client-side pacing for image/video requests, sized to the project's Gemini quota (0 disables)
+RATE_LIMITER = TokenBucket(int(os.getenv("GEMINI_RPM", "60")))
+
+# Image requests in flight at once: grows while responses come back within 30s, halves on
+# 429s/5xx/timeouts. GEMINI_MAX_CONCURRENCY is the ceiling it climbs back to.
+CONCURRENCY_LIMIT = ConcurrencyLimit(int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")), target_latency=30.0)
+
+# Retry schedules: transient failures retry fast, quota (429) waits are long and shared
+TRANSIENT_BASE_DELAY = 0.25
+QUOTA_BASE_DELAY = 5.0
+QUOTA_MAX_DELAY = 60.0
+# Most total waiting one request spends across its retries before giving up
+RETRY_WAIT_BUDGET = 60.0
+
+# HTTP statuses worth retrying; other 4xx (bad request, permission, not found, safety block) fail the same way again
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# User-facing messages for failures the agent can explain, instead of raw SDK errors
+ERROR_MESSAGES = {
+    "quota": "The image generation service is busy right now (rate limit reached). Please try again in a minute.",
+    "safety": "The request was blocked by the model's safety filters. Try rephrasing the prompt or using different images.",
+    "api_key": "The Gemini API key was rejected. Check GEMINI_API_KEY.",
+    "timeout": "The image generation request timed out. Please try again.",
+    "not_found": "The configured image/video model is not available for this API key."
+}
+ERROR_STATUS_KINDS = {401: "api_key", 403: "api_key", 404: "not_found", 408: "timeout", 429: "quota", 504: "timeout"}
+# Searched in the error text when the status code doesn't decide it; groups are in priority order
+ERROR_TEXT_PATTERN = re.compile(
+    r"(?P<safety>safety|blocked|prohibited)"
+    r"|(?P<quota>quota|resource_exhausted|rate limit)"
+    r"|(?P<api_key>api[ _]key)"
+    r"|(?P<timeout>timed out|timeout|deadline)",
+    re.IGNORECASE
+)
+
+# Matches a server-suggested wait in an error message, e.g. "Retry-After: 7" or "retryDelay": "17s"
+RETRY_DELAY_PATTERN = re.compile(r"retry(?:[ -]?after|delay)[\"']?\s*[:=]?\s*[\"']?(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+class ImageGenerationError(Exception):
+    """A Gemini image/video request that still failed after every retry."""
+    
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        # HTTP status of the last attempt, so callers can classify it like the original error
+        self.code = code
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether a failed request is worth retrying: rate limits, server errors and network failures."""
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _format_error(error: Exception) -> dict:
+    """Build the error result for a failed request, with a readable message for known failure kinds."""
+    kind = ERROR_STATUS_KINDS.get(getattr(error, "code", None))
+    if kind is None and isinstance(error, (TimeoutError, httpx.TimeoutException)):
+        kind = "timeout"
+    if kind is None:
+        # One scan of the text; the highest-priority kind mentioned anywhere wins
+        kind = min(
+            (match.lastgroup for match in ERROR_TEXT_PATTERN.finditer(str(error))),
+            key=ERROR_TEXT_PATTERN.groupindex.get,
+            default=None
+        )
+    return {"status": "error", "message": ERROR_MESSAGES.get(kind, str(error))}
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Get the wait the server asked for via a Retry-After header or RetryInfo delay, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    match = RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+async def _retry_with_backoff(
+    func: Callable[[], Awaitable[Any]],
+    max_retries: int = 4,
+    base_delay: float = TRANSIENT_BASE_DELAY,
+    max_delay: float = QUOTA_MAX_DELAY,
+    max_total_delay: float = RETRY_WAIT_BUDGET,
+    track_latency: bool = True
+) -> Any:
+    """
+    Await func(), retrying rate limits and transient failures with separate policies.
+    
+    Network errors and 5xx responses are retried quickly with jittered
+    exponential backoff. A 429 means the quota is spent, so quick retries would
+    only hit it again: instead RATE_LIMITER is slowed down and paused for a long,
+    non-decreasing wait (QUOTA_BASE_DELAY doubling per 429, or the server's
+    Retry-After if longer), which holds back every other caller too. Each attempt
+    also holds a CONCURRENCY_LIMIT slot, which shrinks on that same pushback.
+    
+    Args:
+        func: Zero-argument callable returning the API request coroutine
+        max_retries: Total number of attempts
+        base_delay: Upper bound of the first transient-error wait in seconds, doubled each retry
+        max_delay: Longest single wait in seconds, even if the server asks for more
+        max_total_delay: Give up early rather than wait more than this in total
+        track_latency: Let response times adapt CONCURRENCY_LIMIT (off for slow video requests)
+        
+    Returns:
+        Whatever func's coroutine returns
+        
+    Raises:
+        ImageGenerationError: chained from the last error once retries or the wait
+            budget run out; non-retryable errors are raised unchanged on the first attempt
+    """
+    total_delay = 0.0
+    quota_hits = 0
+    for attempt in range(max_retries):
+        await RATE_LIMITER.acquire_async()
+        await CONCURRENCY_LIMIT.acquire()
+        started = time.monotonic()
+        try:
+            result = await func()
+        except Exception as e:
+            CONCURRENCY_LIMIT.release(overloaded=_is_retryable(e))
+            if not _is_retryable(e):
+                raise
+            if attempt == max_retries - 1:
+                if getattr(e, "code", None) == 429:
+                    RATE_LIMITER.throttled()
+                raise ImageGenerationError(
+                    f"Failed after {max_retries} attempts (total backoff {total_delay:.1f}s): {e}",
+                    code=getattr(e, "code", None)
+                ) from e
+            
+            retry_after = _retry_after_seconds(e) or 0.0
+            quota_exhausted = getattr(e, "code", None) == 429
+            if quota_exhausted:
+                delay = min(max(QUOTA_BASE_DELAY * (2 ** quota_hits), retry_after), max_delay)
+                quota_hits += 1
+            else:
+                # Full jitter, so callers failing at the same moment don't retry in lockstep
+                delay = min(max(random.uniform(0, base_delay * (2 ** attempt)), retry_after), max_delay)
+            
+            if total_delay + delay > max_total_delay:
+                if quota_exhausted:
+                    # Still hold everyone else back for the wait the server asked for
+                    RATE_LIMITER.throttled(pause=delay)
+                raise ImageGenerationError(
+                    f"Gave up after {attempt + 1} attempts (next wait {delay:.1f}s would exceed the "
+                    f"{max_total_delay:.0f}s retry budget): {e}",
+                    code=getattr(e, "code", None)
+                ) from e
+            total_delay += delay
+            
+            if quota_exhausted:
+                logger.warning("⚠️ Gemini quota exhausted (%s), pausing requests for %.1fs...", e, delay)
+                # The next acquire waits out the pause, as does everyone else's
+                RATE_LIMITER.throttled(pause=delay)
+                continue
+            
+            logger.warning("⚠️ Gemini request failed (%s), retrying in %.1fs...", e, delay)
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            CONCURRENCY_LIMIT.release()
+            raise
+        
+        CONCURRENCY_LIMIT.release(latency=time.monotonic() - started if track_latency else None)
+        RATE_LIMITER.succeeded()
+        return result
+
+
+def _open_image(path: str) -> Image.Image:
+    """Open and fully decode an image (Image.open alone defers decoding to first use)."""
+    image = Image.open(path)
+    image.load()
+    return image
+
+
+def _without_unused_alpha(image: Image.Image) -> Image.Image:
+    """
+    Convert an image with no real transparency to plain RGB.
+    
+    The SDK uploads PNG files and RGBA images as PNG and everything else as JPEG,
+    so an opaque reference goes over the wire at a fraction of the size.
+    RGB images are returned as they are, not copied.
+    """
+    if image.mode == "RGB":
+        return image
+    if "A" in image.getbands():
+        if image.getextrema()[-1][0] < 255:
+            return image
+    elif "transparency" in image.info:
+        return image
+    return image.convert("RGB")
+
+
+def _load_for_api(path: str, max_edge: int = API_IMAGE_MAX_EDGE) -> Image.Image:
+    """
+    Open an image scaled down to fit max_edge, for sending alongside a prompt.
+    
+    Unused alpha is dropped before the image is cached, so every caller shares
+    the cached object. It must be treated as read-only.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, max_edge)
+    image = API_IMAGE_CACHE.get(key)
+    if image is None:
+        image = Image.open(path)
+        # thumbnail() decodes at reduced size where it can (JPEG draft mode) and keeps the aspect ratio
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        image = _without_unused_alpha(image)
+        API_IMAGE_CACHE[key] = image
+    return image
+
+
+def _load_upload(path: str, max_edge: Optional[int] = API_IMAGE_MAX_EDGE) -> Any:
+    """
+    Get an image ready to send: the file itself if it's already small enough, else a thumbnail.
+    
+    Files that fit max_edge (None for full size, e.g. images being edited or
+    animated) in a format the API accepts are sent byte-for-byte as a Part,
+    skipping PIL's decode and the SDK's lossy re-encode. Full-size files in
+    other formats are re-encoded by _encode_upload.
+    """
+    with Image.open(path) as im:
+        # Only the header has been read at this point
+        mime_type = UPLOAD_MIME_TYPES.get(im.format) if im.mode != "CMYK" else None
+        fits = max_edge is None or max(im.size) <= max_edge
+    if mime_type and fits:
+        return types.Part.from_bytes(data=Path(path).read_bytes(), mime_type=mime_type)
+    return _encode_upload(_open_image(path)) if max_edge is None else _load_for_api(path, max_edge)
+
+
+def _encode_upload(image: Image.Image) -> Any:
+    """
+    Encode a full-size image in another format as a Part: JPEG, or PNG if it has transparency.
+    
+    The JPEG is quality 90 with 4:2:0 chroma and no optimize pass, keeping the
+    source faithful for editing/animation while encoding in one quick pass.
+    """
+    image = _without_unused_alpha(image)
+    buffer = io.BytesIO()
+    if image.mode == "RGB":
+        image.save(buffer, format="JPEG", quality=UPLOAD_JPEG_QUALITY, subsampling=2, optimize=False)
+        mime_type = "image/jpeg"
+    else:
+        image.save(buffer, format="PNG")
+        mime_type = "image/png"
+    return types.Part.from_bytes(data=buffer.getvalue(), mime_type=mime_type)
+
+
+@lru_cache(maxsize=256)
+def _extract_colors(image_path: str, mtime_ns: int, size: int) -> tuple[str, ...]:
+    """
+    Quantize an image down to its most common colours, as hex strings.
+    
+    The file's mtime and size are part of the cache key, so an image that is
+    replaced on disk is extracted again. Failures raise and are not cached.
+    """
+    with Image.open(image_path) as im:
+        if im.mode in ("RGB", "RGBA"):
+            # Shrink first (JPEGs decode at reduced scale) so only the sample gets converted;
+            # palette modes are converted first so that resampling blends real colours
+            im.thumbnail((PALETTE_SAMPLE_EDGE, PALETTE_SAMPLE_EDGE))
+        return _palette_from_image(im)
+
+
+def _palette_from_image(image: Image.Image) -> tuple[str, ...]:
+    """Quantize an already opened image down to its most common colours, as hex strings."""
+    im = image.convert("RGBA")
+    # Colour proportions survive downsampling, and the quantizer runs in C
+    im.thumbnail((PALETTE_SAMPLE_EDGE, PALETTE_SAMPLE_EDGE))
+    quantized = im.quantize(colors=6, method=Image.Quantize.FASTOCTREE)
+    rgba = quantized.getpalette("RGBA")
+    
+    # Most common colours first, skipping transparent background pixels
+    palette = []
+    for _, index in sorted(quantized.getcolors(), reverse=True):
+        r, g, b, a = rgba[index * 4:index * 4 + 4]
+        if a >= 125:
+            palette.append('#{:02x}{:02x}{:02x}'.format(r, g, b))
+    if not palette:
+        raise ValueError("Image has no opaque pixels")
+    return tuple(palette)
 
 
 def extract_brand_colors(image_path: str) -> dict:
     """
-    Extract dominant colors from a logo/image using ColorThief.
+    Extract dominant colors from a logo/image using Pillow's octree quantizer.
     
     Args:
         image_path: Path to the image file
@@ -27,17 +365,13 @@ def extract_brand_colors(image_path: str) -> dict:
         Dictionary with dominant color and palette
     """
     try:
-        color_thief = ColorThief(image_path)
-        dominant = color_thief.get_color(quality=1)
-        palette = color_thief.get_palette(color_count=6, quality=1)
-        
-        def rgb_to_hex(rgb):
-            return '#{:02x}{:02x}{:02x}'.format(rgb[0], rgb[1], rgb[2])
-        
+        stat = os.stat(image_path)
+        # Absolute path, so "logo.png" and "./logo.png" share a cache entry
+        palette = _extract_colors(os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
         return {
             "status": "success",
-            "dominant": rgb_to_hex(dominant),
-            "palette": [rgb_to_hex(color) for color in palette]
+            "dominant": palette[0],
+            "palette": list(palette)
         }
     except Exception as e:
         return {
@@ -48,113 +382,43 @@ def extract_brand_colors(image_path: str) -> dict:
         }
 
 
-def generate_post_image(
-    prompt: str,
-    brand_name: str = "",
-    brand_colors: str = "",
-    style: str = "creative",
-    logo_path: str = "",
-    output_dir: str = "generated",
-    industry: str = "",
-    occasion: str = "",
-    reference_images: str = "",
-    company_overview: str = "",
-    greeting_text: str = ""
-) -> dict:
-    """
-    Generate a professional social media post image using Gemini.
-    
-    Args:
-        prompt: Description of the image to generate
-        brand_name: Name of the brand/company
-        brand_colors: Comma-separated brand colors (hex codes), e.g. "#3498db,#2ecc71"
-        style: Visual style (creative, professional, playful, minimal, bold)
-        logo_path: Path to logo image to incorporate
-        output_dir: Directory to save generated images
-        industry: Brand's industry/niche
-        occasion: Special occasion/event theme
-        reference_images: Comma-separated paths to reference images for style inspiration
-        company_overview: Description of what the company does (for contextual imagery)
-        greeting_text: Event greeting text to display at top of image (e.g., "Happy Valentine's Day!")
-        
-    Returns:
-        Dictionary with image path and generation details
-    """
-    # Debug logging
-    print(f"🎨 generate_post_image called:")
-    print(f"   - prompt: {prompt[:100]}...")
-    print(f"   - brand_name: {brand_name}")
-    print(f"   - logo_path: {logo_path}")
-    print(f"   - reference_images: {reference_images}")
-    
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        return {"status": "error", "message": "No API key found. Set GEMINI_API_KEY environment variable."}
-    
-    client = genai.Client(api_key=api_key)
-    
-    # Build color instructions - parse comma-separated colors
-    color_scheme = ""
-    if brand_colors:
-        colors_list = [c.strip() for c in brand_colors.split(",") if c.strip()]
-        if colors_list:
-            color_scheme = f"Primary brand color: {colors_list[0]}. "
-            if len(colors_list) > 1:
-                color_scheme += f"Accent colors: {', '.join(colors_list[1:3])}. "
-    
-    # Style descriptions
-    style_descriptions = {
-        'creative': 'Artistic, imaginative, and visually striking with unique creative elements',
-        'professional': 'Clean, corporate, and polished with a business-appropriate aesthetic',
-        'playful': 'Fun, vibrant, and energetic with playful visual elements',
-        'minimal': 'Simple, clean, and focused with minimal visual clutter',
-        'bold': 'Strong, impactful, and attention-grabbing with bold colors and shapes'
-    }
-    style_desc = style_descriptions.get(style, style_descriptions['creative'])
-    
-    # Build occasion context
-    occasion_context = ""
-    if occasion:
-        occasion_context = f"\nTheme/Occasion: {occasion} - Incorporate subtle thematic elements related to this."
-    
-    # Build reference images context
-    reference_context = ""
-    has_reference_images = False
-    extracted_ref_colors = []
-    use_real_people = True  # Default to real people if no references
-    
-    if reference_images:
-        ref_paths = [p.strip() for p in reference_images.split(",") if p.strip() and os.path.exists(p.strip())]
-        print(f"   📸 Reference image paths found: {len(ref_paths)} images")
-        for rp in ref_paths:
-            print(f"      - {rp} (exists: {os.path.exists(rp)})")
-        
-        # Auto-extract colors from first few references
-        for rp in ref_paths[:3]:  # Extract from up to 3 references
-            try:
-                ref_colors = extract_brand_colors(rp)
-                if ref_colors.get("status") == "success":
-                    extracted_ref_colors.append(ref_colors.get("dominant"))
-                    extracted_ref_colors.extend(ref_colors.get("palette", [])[:2])
-            except:
-                pass
-        
-        # Remove duplicates and format
-        extracted_ref_colors = list(dict.fromkeys(extracted_ref_colors))[:6]
-        extracted_colors_str = ", ".join(extracted_ref_colors) if extracted_ref_colors else "Match reference style"
-        print(f"   🎨 Auto-extracted colors from refs: {extracted_colors_str}")
-        
-        if ref_paths:
-            has_reference_images = True
-            use_real_people = False  # Use reference style instead
-            reference_context = f"""
+# Visual style line for each generate_post_image style
+STYLE_DESCRIPTIONS = {
+    'creative': 'Artistic, imaginative, and visually striking with unique creative elements',
+    'professional': 'Clean, corporate, and polished with a business-appropriate aesthetic',
+    'playful': 'Fun, vibrant, and energetic with playful visual elements',
+    'minimal': 'Simple, clean, and focused with minimal visual clutter',
+    'bold': 'Strong, impactful, and attention-grabbing with bold colors and shapes'
+}
+
+# Imagery hints suggested when the company overview mentions any of the keywords
+COMPANY_VISUALS = (
+    (('freelance', 'freelancing', 'gig', 'remote'), "modern professionals, laptops, flexible work, digital connections"),
+    (('platform', 'marketplace', 'connect'), "people connecting, handshakes, bridge metaphors, networks"),
+    (('tech', 'technology', 'software', 'app'), "sleek devices, digital interfaces, modern aesthetics"),
+    (('business', 'enterprise', 'corporate'), "professional settings, success imagery, growth charts"),
+    (('creative', 'design', 'art'), "artistic elements, creative tools, vibrant colors"),
+)
+
+# Greeting pulled from the prompt when greeting_text isn't given, first match wins
+GREETING_PATTERN = re.compile(r'GREETING[:\s]*["\']?([^"\'"\n]+)["\']?', re.IGNORECASE)
+KNOWN_GREETINGS = (
+    ("happy valentine", "Happy Valentine's Day!"),
+    ("happy republic", "Happy Republic Day!"),
+    ("happy diwali", "Happy Diwali!"),
+    ("happy holi", "Happy Holi!"),
+    ("happy new year", "Happy New Year!"),
+)
+
+# Fixed sections of the generate_post_image prompt
+REFERENCE_CONTEXT_TEMPLATE = """
 ═══════════════════════════════════════════════
-🎨 REFERENCE IMAGES ({len(ref_paths)} provided) - MATCH THIS STYLE!
+🎨 REFERENCE IMAGES ({count} provided) - MATCH THIS STYLE!
 ═══════════════════════════════════════════════
 ⚠️ CRITICAL: These references define the EXACT visual identity!
 
 🎯 AUTO-EXTRACTED COLORS FROM REFERENCES:
-{extracted_colors_str}
+{colors}
 
 ✅ YOU MUST MATCH:
 1. **COLOR PALETTE**: Use the extracted colors above as PRIMARY palette
@@ -170,15 +434,14 @@ def generate_post_image(
 3. THIRD: Add the specific content/text requested
 
 🎨 COLOR APPLICATION:
-- PRIMARY (headlines/main elements): {extracted_ref_colors[0] if extracted_ref_colors else 'From references'}
-- BACKGROUND: {extracted_ref_colors[1] if len(extracted_ref_colors) > 1 else 'From references'}
-- ACCENTS: {extracted_ref_colors[2] if len(extracted_ref_colors) > 2 else 'Brand colors'}
+- PRIMARY (headlines/main elements): {primary}
+- BACKGROUND: {background}
+- ACCENTS: {accents}
 
 Think of this as: "Create a NEW image that looks like it belongs in the SAME CAMPAIGN as the references."
 The generated image should feel like it was designed by the SAME designer who made the references."""
-    else:
-        # No reference images - use real people default
-        reference_context = """
+
+NO_REFERENCE_CONTEXT = """
 ═══════════════════════════════════════════════
 📷 NO REFERENCE IMAGES - USE REAL PEOPLE!
 ═══════════════════════════════════════════════
@@ -206,10 +469,7 @@ The generated image should feel like it was designed by the SAME designer who ma
 
 **The image should feel like a premium lifestyle/business magazine photo shoot.**"""
 
-    # Build logo context
-    logo_context = ""
-    if logo_path and os.path.exists(logo_path):
-        logo_context = """
+LOGO_CONTEXT = """
 ═══════════════════════════════════════════════
 🖼️ BRAND LOGO (CRITICAL - MUST BE ACCURATE!)
 ═══════════════════════════════════════════════
@@ -229,39 +489,148 @@ A brand logo image has been provided. THIS IS THE ACTUAL LOGO - USE IT EXACTLY!
 □ Logo is readable and not pixelated
 □ Logo placement is professional
 □ Logo doesn't clash with other design elements"""
+
+
+COMPANY_CONTEXT_TEMPLATE = """
+═══════════════════════════════════════════════
+🏢 COMPANY CONTEXT (Use for Relevant Imagery!)
+═══════════════════════════════════════════════
+WHAT THEY DO: {overview}
+
+SUGGESTED VISUAL ELEMENTS: {visuals}
+
+⚠️ Imagery should RELATE to their business - don't just show generic graphics!"""
+
+GREETING_BANNER_TEMPLATE = """
+⭐⭐⭐ MANDATORY GREETING AT TOP OF IMAGE ⭐⭐⭐
+🎊 GREETING TEXT: "{greeting}"
+- This greeting MUST appear at the VERY TOP of the image
+- Use large, celebratory, festive typography
+- Make it the FIRST thing viewers see
+- Position: Top-center, above the headline
+- DO NOT SKIP THIS TEXT!
+"""
+
+POST_DESIGN_REQUIREMENTS = """═══════════════════════════════════════════════
+📐 TECHNICAL SPECIFICATIONS
+═══════════════════════════════════════════════
+- Aspect Ratio: 4:5 (Instagram optimal - 1080x1350px feel)
+- Quality: Ultra-high definition, crisp and sharp
+- Format: Ready for immediate posting
+
+═══════════════════════════════════════════════
+✨ PROFESSIONAL DESIGN REQUIREMENTS
+═══════════════════════════════════════════════
+1. SCROLL-STOPPING POWER: First 0.5 seconds must grab attention
+2. BRAND CONSISTENCY: Every element reinforces brand identity
+3. VISUAL HIERARCHY: Clear focal point with supporting elements
+4. PREMIUM QUALITY: Magazine-cover worthy aesthetics
+5. INSTAGRAM OPTIMIZED: Perfect for feed viewing
+
+COMPOSITION RULES:
+- Rule of thirds for balanced layouts
+- Strategic use of negative space
+- Eye-flow guidance toward key message
+- Balanced text-to-visual ratio if any text included
+
+QUALITY MARKERS:
+- Professional studio lighting quality
+- Rich, intentional color palette
+- Depth and dimension
+- Clean, refined edges
+- Cohesive visual storytelling"""
+
+
+def _build_post_prompt(
+    prompt: str,
+    brand_name: str,
+    brand_colors: str,
+    style: str,
+    logo_path: str,
+    has_logo: bool,
+    industry: str,
+    occasion: str,
+    reference_images: str,
+    ref_paths: list[str],
+    ref_colors: list[str],
+    company_overview: str,
+    greeting_text: str
+) -> str:
+    """
+    Build the full image generation prompt for generate_post_image.
+    
+    has_logo, ref_paths and ref_colors are worked out by generate_post_image
+    and _load_post_images, so the logo and references are checked, parsed and
+    decoded once for both the prompt and the request.
+    """
+    # Build color instructions - parse comma-separated colors
+    color_scheme = ""
+    if brand_colors:
+        colors_list = [c.strip() for c in brand_colors.split(",") if c.strip()]
+        if colors_list:
+            color_scheme = f"Primary brand color: {colors_list[0]}. "
+            if len(colors_list) > 1:
+                color_scheme += f"Accent colors: {', '.join(colors_list[1:3])}. "
+    
+    style_desc = STYLE_DESCRIPTIONS.get(style, STYLE_DESCRIPTIONS['creative'])
+    
+    # Build occasion context
+    occasion_context = ""
+    if occasion:
+        occasion_context = f"\nTheme/Occasion: {occasion} - Incorporate subtle thematic elements related to this."
+    
+    # Build reference images context
+    reference_context = ""
+    has_reference_images = False
+    extracted_ref_colors = []
+    use_real_people = True  # Default to real people if no references
+    
+    if reference_images:
+        logger.info("   📸 Reference image paths found: %d images", len(ref_paths))
+        for rp in ref_paths:
+            logger.info("      - %s", rp)
+        
+        extracted_ref_colors = ref_colors
+        extracted_colors_str = ", ".join(extracted_ref_colors) if extracted_ref_colors else "Match reference style"
+        logger.info("   🎨 Auto-extracted colors from refs: %s", extracted_colors_str)
+        
+        if ref_paths:
+            has_reference_images = True
+            use_real_people = False  # Use reference style instead
+            reference_context = REFERENCE_CONTEXT_TEMPLATE.format(
+                count=len(ref_paths),
+                colors=extracted_colors_str,
+                primary=extracted_ref_colors[0] if extracted_ref_colors else 'From references',
+                background=extracted_ref_colors[1] if len(extracted_ref_colors) > 1 else 'From references',
+                accents=extracted_ref_colors[2] if len(extracted_ref_colors) > 2 else 'Brand colors'
+            )
+    else:
+        # No reference images - use real people default
+        reference_context = NO_REFERENCE_CONTEXT
+
+    # Build logo context
+    logo_context = ""
+    if has_logo:
+        logo_context = LOGO_CONTEXT
     
     # Build company context with imagery suggestions
     company_context = ""
     if company_overview:
         # Generate relevant visual elements based on company overview
         company_lower = company_overview.lower()
-        visual_suggestions = []
-        
-        if any(word in company_lower for word in ['freelance', 'freelancing', 'gig', 'remote']):
-            visual_suggestions.append("modern professionals, laptops, flexible work, digital connections")
-        if any(word in company_lower for word in ['platform', 'marketplace', 'connect']):
-            visual_suggestions.append("people connecting, handshakes, bridge metaphors, networks")
-        if any(word in company_lower for word in ['tech', 'technology', 'software', 'app']):
-            visual_suggestions.append("sleek devices, digital interfaces, modern aesthetics")
-        if any(word in company_lower for word in ['business', 'enterprise', 'corporate']):
-            visual_suggestions.append("professional settings, success imagery, growth charts")
-        if any(word in company_lower for word in ['creative', 'design', 'art']):
-            visual_suggestions.append("artistic elements, creative tools, vibrant colors")
+        visual_suggestions = [
+            suggestion for keywords, suggestion in COMPANY_VISUALS
+            if any(word in company_lower for word in keywords)
+        ]
         
         visual_elements = " | ".join(visual_suggestions) if visual_suggestions else "professional, relevant imagery"
         
-        company_context = f"""
-═══════════════════════════════════════════════
-🏢 COMPANY CONTEXT (Use for Relevant Imagery!)
-═══════════════════════════════════════════════
-WHAT THEY DO: {company_overview}
-
-SUGGESTED VISUAL ELEMENTS: {visual_elements}
-
-⚠️ Imagery should RELATE to their business - don't just show generic graphics!"""
+        company_context = COMPANY_CONTEXT_TEMPLATE.format(
+            overview=company_overview,
+            visuals=visual_elements
+        )
     
     # Extract text elements from prompt if present
-    import re
     extracted_greeting = ""
     
     # Parse prompt for greeting if not provided as parameter
@@ -269,23 +638,18 @@ SUGGESTED VISUAL ELEMENTS: {visual_elements}
     if not greeting_text:  # Only extract if not provided as parameter
         if "greeting:" in prompt_lower or "happy " in prompt_lower:
             # Try to extract greeting
-            greeting_match = re.search(r'GREETING[:\s]*["\']?([^"\'"\n]+)["\']?', prompt, re.IGNORECASE)
+            greeting_match = GREETING_PATTERN.search(prompt)
             if greeting_match:
                 extracted_greeting = greeting_match.group(1).strip()
-            elif "happy valentine" in prompt_lower:
-                extracted_greeting = "Happy Valentine's Day!"
-            elif "happy republic" in prompt_lower:
-                extracted_greeting = "Happy Republic Day!"
-            elif "happy diwali" in prompt_lower:
-                extracted_greeting = "Happy Diwali!"
-            elif "happy holi" in prompt_lower:
-                extracted_greeting = "Happy Holi!"
-            elif "happy new year" in prompt_lower:
-                extracted_greeting = "Happy New Year!"
+            else:
+                extracted_greeting = next(
+                    (greeting for phrase, greeting in KNOWN_GREETINGS if phrase in prompt_lower),
+                    ""
+                )
     
     # Use parameter if provided, otherwise use extracted
     final_greeting = greeting_text if greeting_text else extracted_greeting
-    print(f"   🎊 Greeting text: '{final_greeting}'")
+    logger.info("   🎊 Greeting text: '%s'", final_greeting)
     
     # Build the prompt - professional social media marketer approach
     full_prompt = f"""You are an ELITE SOCIAL MEDIA DESIGNER creating a premium Instagram post for a professional marketing campaign.
@@ -303,15 +667,7 @@ MAIN MESSAGE/SUBJECT: {prompt}
 ═══════════════════════════════════════════════
 ⚠️ ALL TEXT BELOW MUST APPEAR ON THE IMAGE EXACTLY AS SPECIFIED:
 
-{f'''
-⭐⭐⭐ MANDATORY GREETING AT TOP OF IMAGE ⭐⭐⭐
-🎊 GREETING TEXT: "{final_greeting}"
-- This greeting MUST appear at the VERY TOP of the image
-- Use large, celebratory, festive typography
-- Make it the FIRST thing viewers see
-- Position: Top-center, above the headline
-- DO NOT SKIP THIS TEXT!
-''' if final_greeting else ''}
+{GREETING_BANNER_TEMPLATE.format(greeting=final_greeting) if final_greeting else ''}
 
 The image MUST include these text elements as overlays:
 1. {"🎊 GREETING: '" + final_greeting + "' - AT THE TOP!" if final_greeting else "No greeting required"}
@@ -330,34 +686,7 @@ VISUAL STYLE: {style_desc}
 {logo_context}
 {reference_context}
 
-═══════════════════════════════════════════════
-📐 TECHNICAL SPECIFICATIONS
-═══════════════════════════════════════════════
-- Aspect Ratio: 4:5 (Instagram optimal - 1080x1350px feel)
-- Quality: Ultra-high definition, crisp and sharp
-- Format: Ready for immediate posting
-
-═══════════════════════════════════════════════
-✨ PROFESSIONAL DESIGN REQUIREMENTS
-═══════════════════════════════════════════════
-1. SCROLL-STOPPING POWER: First 0.5 seconds must grab attention
-2. BRAND CONSISTENCY: Every element reinforces brand identity
-3. VISUAL HIERARCHY: Clear focal point with supporting elements
-4. PREMIUM QUALITY: Magazine-cover worthy aesthetics
-5. INSTAGRAM OPTIMIZED: Perfect for feed viewing
-
-COMPOSITION RULES:
-- Rule of thirds for balanced layouts
-- Strategic use of negative space
-- Eye-flow guidance toward key message
-- Balanced text-to-visual ratio if any text included
-
-QUALITY MARKERS:
-- Professional studio lighting quality
-- Rich, intentional color palette
-- Depth and dimension
-- Clean, refined edges
-- Cohesive visual storytelling
+{POST_DESIGN_REQUIREMENTS}
 
 {"IMPORTANT: If logo is provided, it MUST be visible and integrated professionally in the final image." if logo_path else ""}
 
@@ -371,70 +700,408 @@ Create an image that:
 2. Incorporates the company context appropriately
 3. Uses brand colors effectively
 4. A Fortune 500 company would proudly post."""
+    
+    return full_prompt
+
 
+def _reference_paths(reference_images: str, logo_path: str = "") -> list[str]:
+    """
+    Split the comma-separated reference image list into the distinct paths that exist.
+    
+    Repeats, and the logo if it was also passed as a reference, are dropped so
+    each file is decoded and uploaded once.
+    """
+    seen = {os.path.abspath(logo_path)} if logo_path else set()
+    paths = []
+    for path in (p.strip() for p in reference_images.split(",")):
+        key = os.path.abspath(path) if path else ""
+        if path and key not in seen and os.path.exists(path):
+            seen.add(key)
+            paths.append(path)
+    return paths
+
+
+def _load_reference(path: str, with_colors: bool) -> tuple[Any, tuple[str, ...]]:
+    """Open a reference image for the API and, if asked, quantize its colours from the same decode."""
+    if not with_colors:
+        return _load_upload(path), ()
+    image = _load_for_api(path)
     try:
-        model = os.getenv("IMAGE_MODEL", "gemini-3-pro-image-preview")
+        return image, _palette_from_image(image)
+    except ValueError:
+        return image, ()
+
+
+def _in_image_pool(func: Callable[..., Any], *args: Any) -> Awaitable[Any]:
+    """Run blocking image work on IMAGE_POOL, awaitable from the event loop."""
+    return asyncio.get_running_loop().run_in_executor(IMAGE_POOL, func, *args)
+
+
+async def _load_post_images(logo_path: str, ref_paths: list[str]) -> tuple[list, list[str]]:
+    """
+    Open the logo and reference images to send along with the prompt.
+    
+    Colours are auto-extracted from the first 3 references in the same pass.
+    
+    Args:
+        logo_path: Logo file already known to exist, or "" for no logo
+        ref_paths: Reference files already known to exist, from _reference_paths
         
-        # Prepare contents - include logo and reference images if provided
-        contents = [full_prompt]
+    Returns:
+        The opened images in prompt order, and up to MAX_REFERENCE_COLORS
+        distinct reference colours
+    """
+    # Decode everything at once on the shared pool, then collect in prompt order
+    jobs = [_in_image_pool(_load_reference, ref_path, i < 3) for i, ref_path in enumerate(ref_paths)]
+    if logo_path:
+        jobs.insert(0, _in_image_pool(_load_upload, logo_path))
+    loaded = await asyncio.gather(*jobs, return_exceptions=True)
+    
+    images = []
+    ref_colors = []
+    seen_colors = set()
+    
+    # Add logo if provided
+    if logo_path:
+        logo_image = loaded.pop(0)
+        if isinstance(logo_image, Exception):
+            raise logo_image
+        images.append(logo_image)
+    
+    # Add reference images if provided
+    for ref_path, ref_result in zip(ref_paths, loaded):
+        if isinstance(ref_result, Exception):
+            logger.warning("Could not load reference image %s: %s", ref_path, ref_result)
+            continue
+        ref_image, palette = ref_result
+        images.append(ref_image)
+        # Top two colours of each reference, deduplicated as we go
+        for color in palette[:2]:
+            if color not in seen_colors and len(ref_colors) < MAX_REFERENCE_COLORS:
+                seen_colors.add(color)
+                ref_colors.append(color)
+    
+    return images, ref_colors
+
+
+def _ensure_dir(path: str) -> Path:
+    """Create an output directory the first time it is used, then trust that it exists."""
+    if path not in CREATED_DIRS:
+        Path(path).mkdir(parents=True, exist_ok=True)
+        CREATED_DIRS.add(path)
+    return Path(path)
+
+
+def _write_blob(path: Path, data: bytes) -> None:
+    """Write bytes straight to a new file with os.write, skipping the buffered file object."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _image_extension(data: Optional[bytes]) -> Optional[str]:
+    """File extension for PNG, JPEG or WebP bytes, or None if the data is none of those."""
+    if not data:
+        return None
+    if data.startswith(PNG_SIGNATURE):
+        return "png"
+    if data.startswith(JPEG_SIGNATURE):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _file_timestamp() -> str:
+    """Current time in the form used in generated filenames."""
+    return f"{datetime.now():%Y%m%d_%H%M%S}"
+
+
+def _save_inline_data(
+    response: Any,
+    output_dir: str,
+    prefix: str,
+    extension: Optional[str] = None,
+    mime_type: str = "",
+    candidate: int = 0,
+    stamp: str = ""
+) -> Optional[tuple[str, Path]]:
+    """
+    Save the first inline file in one candidate of a Gemini response.
+    
+    Args:
+        response: generate_content response
+        output_dir: Directory to save into (created if missing)
+        prefix: Filename prefix, e.g. "post"
+        extension: Filename extension, e.g. "mp4". If None, only parts holding
+            valid PNG, JPEG or WebP data are accepted and named after their format
+        mime_type: Only accept parts whose MIME type contains this
+        candidate: Index of the response candidate to save from
+        stamp: Timestamp for the filename, so one response's files share it; now if empty
         
-        # Add logo if provided
-        if logo_path and os.path.exists(logo_path):
-            logo_image = Image.open(logo_path)
-            contents.append(logo_image)
+    Returns:
+        (filename, path) of the saved file, or None if the candidate had none
+    """
+    part = next(
+        (
+            part for part in response.candidates[candidate].content.parts
+            if part.inline_data is not None and mime_type in (part.inline_data.mime_type or "")
+            and (extension is not None or _image_extension(part.inline_data.data) is not None)
+        ),
+        None
+    )
+    if part is None:
+        logger.warning("⚠️ No usable %s data in response candidate %d", extension or "image", candidate)
+        return None
+    extension = extension or _image_extension(part.inline_data.data)
+    
+    output_path = _ensure_dir(output_dir)
+    
+    # Name the file once, for the one part being saved
+    filename = f"{prefix}_{stamp or _file_timestamp()}_{secrets.token_hex(4)}.{extension}"
+    file_path = output_path / filename
+    
+    # Write the bytes straight out and drop the response's copy so a
+    # multi-MB image isn't kept alive while the caller builds its result
+    try:
+        _write_blob(file_path, part.inline_data.data)
+    except FileNotFoundError:
+        # The directory was removed after we created it: make it again
+        CREATED_DIRS.discard(output_dir)
+        _ensure_dir(output_dir)
+        _write_blob(file_path, part.inline_data.data)
+    part.inline_data.data = None
+    
+    return filename, file_path
+
+
+def _save_post_images(response: Any, output_dir: str, count: int) -> list[tuple[str, Path]]:
+    """Save the image from each of the first count candidates, skipping any without one."""
+    stamp = _file_timestamp()
+    saved = (
+        _save_inline_data(response, output_dir, "post", candidate=index, stamp=stamp)
+        for index in range(min(count, len(response.candidates or [])))
+    )
+    return [item for item in saved if item is not None]
+
+
+def _post_result(saved: list[tuple[str, Path]], count: int, prompt: str, style: str, model: str) -> dict:
+    """Build the generate_post_image result for the saved images (if any)."""
+    if not saved:
+        return {"status": "error", "message": "No image was generated in the response"}
+    
+    details = {"prompt_used": prompt, "style": style, "model": model}
+    if count == 1:
+        filename, image_path = saved[0]
+        return {
+            "status": "success",
+            "image_path": str(image_path),
+            "filename": filename,
+            "url": f"/generated/{filename}",
+            **details
+        }
+    
+    return {
+        "status": "success",
+        "image_paths": [str(image_path) for _, image_path in saved],
+        "filenames": [filename for filename, _ in saved],
+        "urls": [f"/generated/{filename}" for filename, _ in saved],
+        **details
+    }
+
+
+def _file_stamp(path: str) -> Optional[tuple[int, int]]:
+    """(mtime, size) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cache_post_results(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Serve repeated generate_post_image calls from POST_RESULT_CACHE.
+    
+    Calls are keyed on every argument plus the mtime and size of the logo and
+    reference files, so replacing one of those images misses the cache. Only
+    successful results whose image is still on disk are reused; force=True
+    skips the lookup and stores the fresh result in its place.
+    """
+    signature = inspect.signature(func)
+    
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> dict:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        force = params.pop("force", False)
+        files = [params["logo_path"], *params["reference_images"].split(",")]
+        # Same (name, context, arguments) shape as cached_llm_call keys, which the disk cache expects
+        key = (
+            func.__name__,
+            tuple(_file_stamp(path.strip()) for path in files if path.strip()),
+            tuple(sorted(params.items()))
+        )
         
-        # Add reference images if provided
-        if reference_images:
-            ref_paths = [p.strip() for p in reference_images.split(",") if p.strip()]
-            for ref_path in ref_paths:
-                if os.path.exists(ref_path):
-                    try:
-                        ref_image = Image.open(ref_path)
-                        contents.append(ref_image)
-                    except Exception as e:
-                        print(f"Could not load reference image {ref_path}: {e}")
+        cached = None if force else POST_RESULT_CACHE.get(key)
+        if cached is not None:
+            paths = cached.get("image_paths") or [cached["image_path"]]
+            if all(os.path.exists(path) for path in paths):
+                logger.info("♻️ Reusing generated image: %s", ", ".join(paths))
+                return dict(cached)
         
-        response = client.models.generate_content(
+        result = await func(*args, **kwargs)
+        if result.get("status") == "success":
+            POST_RESULT_CACHE.set(key, dict(result))
+        return result
+    
+    return wrapper
+
+
+@_cache_post_results
+async def generate_post_image(
+    prompt: str,
+    brand_name: str = "",
+    brand_colors: str = "",
+    style: str = "creative",
+    logo_path: str = "",
+    output_dir: str = "generated",
+    industry: str = "",
+    occasion: str = "",
+    reference_images: str = "",
+    company_overview: str = "",
+    greeting_text: str = "",
+    count: int = 1,
+    force: bool = False
+) -> dict:
+    """
+    Generate a professional social media post image using Gemini.
+    
+    Args:
+        prompt: Description of the image to generate
+        brand_name: Name of the brand/company
+        brand_colors: Comma-separated brand colors (hex codes), e.g. "#3498db,#2ecc71"
+        style: Visual style (creative, professional, playful, minimal, bold)
+        logo_path: Path to logo image to incorporate
+        output_dir: Directory to save generated images
+        industry: Brand's industry/niche
+        occasion: Special occasion/event theme
+        reference_images: Comma-separated paths to reference images for style inspiration
+        company_overview: Description of what the company does (for contextual imagery)
+        greeting_text: Event greeting text to display at top of image (e.g., "Happy Valentine's Day!")
+        count: Number of variants to generate in the same request (1-8)
+        force: Generate a new image even if this exact request was made before
+        
+    Returns:
+        Dictionary with image path and generation details; for count > 1,
+        image_paths, filenames and urls lists instead
+    """
+    # Debug logging
+    logger.info(
+        "🎨 generate_post_image called:\n"
+        "   - prompt: %.100s...\n"
+        "   - brand_name: %s\n"
+        "   - logo_path: %s\n"
+        "   - reference_images: %s",
+        prompt, brand_name, logo_path, reference_images
+    )
+    
+    client = get_client()
+    if client is None:
+        return {"status": "error", "message": "No API key found. Set GEMINI_API_KEY environment variable."}
+    
+    model = gemini.IMAGE_MODEL
+    # Variants come back as candidates of one request, so the prompt and images are sent once
+    count = max(1, min(count, MAX_IMAGES_PER_REQUEST))
+
+    try:
+        # Image decoding and colour extraction are blocking work, keep them off the loop
+        # Parse and stat the logo and references once, for both the prompt and the request
+        has_logo = bool(logo_path) and os.path.exists(logo_path)
+        ref_paths = _reference_paths(reference_images, logo_path if has_logo else "")
+        images, ref_colors = await _load_post_images(logo_path if has_logo else "", ref_paths)
+        full_prompt = _build_post_prompt(
+            prompt, brand_name, brand_colors, style, logo_path, has_logo, industry, occasion,
+            reference_images, ref_paths, ref_colors, company_overview, greeting_text
+        )
+        contents = [full_prompt] + images
+        
+        response = await _retry_with_backoff(lambda: client.aio.models.generate_content(
             model=model,
             contents=contents,
             config=types.GenerateContentConfig(
                 response_modalities=["image", "text"],
+                candidate_count=count,
             )
-        )
+        ))
         
-        # Create output directory
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        # Process response and save image
-        for part in response.candidates[0].content.parts:
-            if part.inline_data is not None:
-                image_id = str(uuid.uuid4())[:8]
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"post_{timestamp}_{image_id}.png"
-                image_path = output_path / filename
-                
-                # Save the image
-                with open(image_path, "wb") as f:
-                    f.write(part.inline_data.data)
-                
-                return {
-                    "status": "success",
-                    "image_path": str(image_path),
-                    "filename": filename,
-                    "url": f"/generated/{filename}",
-                    "prompt_used": prompt,
-                    "style": style,
-                    "model": model
-                }
-        
-        return {"status": "error", "message": "No image was generated in the response"}
+        saved = await _in_image_pool(_save_post_images, response, output_dir, count)
+        return _post_result(saved, count, prompt, style, model)
             
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return _format_error(e)
+
+
+async def generate_post_images_batch(requests: list[dict], max_concurrency: int = 5) -> list[dict]:
+    """
+    Generate several post images concurrently, e.g. style or colour variants for A/B tests.
+    
+    Args:
+        requests: Keyword arguments for generate_post_image, one dict per image
+        max_concurrency: Most Gemini requests in flight at once, kept under the rate limit
+        
+    Returns:
+        One result dictionary per request, in the same order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def generate(request: dict) -> dict:
+        async with semaphore:
+            return await generate_post_image(**request)
+    
+    results = await asyncio.gather(*(generate(request) for request in requests), return_exceptions=True)
+    # A bad request (e.g. a missing prompt) fails on its own instead of sinking the batch
+    return [
+        _format_error(result) if isinstance(result, Exception) else result
+        for result in results
+    ]
+
+
+# Prompt for edit_post_image
+EDIT_PROMPT_TEMPLATE = """Edit this image with the following changes:
+{instruction}
+
+Keep the overall quality and style of the image while making the requested modifications.
+Maintain professional, high-quality output suitable for Instagram."""
 
 
-def edit_post_image(
+def _build_edit_prompt(edit_instruction: str) -> str:
+    """Build the prompt for edit_post_image."""
+    return EDIT_PROMPT_TEMPLATE.format(instruction=edit_instruction)
+
+
+def _edit_result(saved: Optional[tuple[str, Path]], edit_instruction: str, original_image_path: str) -> dict:
+    """Build the edit_post_image result for a saved (or missing) image."""
+    if saved is None:
+        return {"status": "error", "message": "No edited image was generated"}
+    
+    filename, image_path = saved
+    return {
+        "status": "success",
+        "image_path": str(image_path),
+        "filename": filename,
+        "url": f"/generated/{filename}",
+        "edit_instruction": edit_instruction,
+        "original_image": original_image_path
+    }
+
+
+async def edit_post_image(
     original_image_path: str,
     edit_instruction: str,
     output_dir: str = "generated"
@@ -450,64 +1117,128 @@ def edit_post_image(
     Returns:
         Dictionary with new image path and edit details
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
     if not os.path.exists(original_image_path):
         return {"status": "error", "message": f"Original image not found: {original_image_path}"}
     
-    client = genai.Client(api_key=api_key)
-    
-    edit_prompt = f"""Edit this image with the following changes:
-{edit_instruction}
-
-Keep the overall quality and style of the image while making the requested modifications.
-Maintain professional, high-quality output suitable for Instagram."""
+    edit_prompt = _build_edit_prompt(edit_instruction)
+    model = gemini.EDIT_MODEL
 
     try:
-        model = os.getenv("IMAGE_MODEL", "gemini-3-pro-image-preview")
-        
-        # Load original image
-        original_image = Image.open(original_image_path)
+        original_image = await _in_image_pool(_load_upload, original_image_path, None)
         
-        response = client.models.generate_content(
+        response = await _retry_with_backoff(lambda: client.aio.models.generate_content(
             model=model,
             contents=[edit_prompt, original_image],
             config=types.GenerateContentConfig(
                 response_modalities=["image", "text"],
             )
-        )
-        
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        for part in response.candidates[0].content.parts:
-            if part.inline_data is not None:
-                image_id = str(uuid.uuid4())[:8]
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"edited_{timestamp}_{image_id}.png"
-                image_path = output_path / filename
-                
-                with open(image_path, "wb") as f:
-                    f.write(part.inline_data.data)
-                
-                return {
-                    "status": "success",
-                    "image_path": str(image_path),
-                    "filename": filename,
-                    "url": f"/generated/{filename}",
-                    "edit_instruction": edit_instruction,
-                    "original_image": original_image_path
-                }
+        ))
         
-        return {"status": "error", "message": "No edited image was generated"}
+        saved = await _in_image_pool(_save_inline_data, response, output_dir, "edited")
+        return _edit_result(saved, edit_instruction, original_image_path)
             
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return _format_error(e)
+
+
+# Prompt for animate_image
+ANIMATION_PROMPT_TEMPLATE = """Create a short, looping video animation based on this image.
+
+MOTION INSTRUCTIONS:
+{motion}
+
+ANIMATION GUIDELINES:
+- Duration: {duration} seconds
+- Create smooth, seamless motion that loops well
+- Maintain the original image quality and composition
+- Keep brand elements (logo, text) stable and clear
+- Add subtle, professional motion that enhances engagement
+- Suitable for Instagram Reels/Stories format
+
+MOTION STYLE:
+- Cinemagraph-style: Only specific elements should move
+- Keep the overall composition stable
+- Avoid jarring or distracting motion
+- Aim for premium, polished feel
+
+OUTPUT: A high-quality MP4 video that makes this static post come alive."""
+
+
+def _build_animation_prompt(motion_prompt: str, duration_seconds: int) -> str:
+    """Build the prompt for animate_image."""
+    return ANIMATION_PROMPT_TEMPLATE.format(motion=motion_prompt, duration=duration_seconds)
+
+
+def _animation_result(
+    saved: Optional[tuple[str, Path]],
+    image_path: str,
+    motion_prompt: str,
+    duration_seconds: int,
+    video_model: str
+) -> dict:
+    """Build the animate_image result for a saved (or missing) video."""
+    if saved is not None:
+        filename, video_path = saved
+        logger.info("✅ Video saved: %s", video_path)
+        
+        return {
+            "status": "success",
+            "video_path": str(video_path),
+            "filename": filename,
+            "url": f"/generated/{filename}",
+            "motion_prompt": motion_prompt,
+            "duration_seconds": duration_seconds,
+            "source_image": image_path,
+            "model": video_model,
+            "type": "video"
+        }
+    
+    # If video generation not available, try alternative approach
+    # Using image model with motion simulation
+    logger.warning("⚠️ Video model response empty, trying alternative approach...")
+    
+    return {
+        "status": "partial",
+        "message": "Video generation is being processed. The animated version will be available shortly.",
+        "source_image": image_path,
+        "motion_prompt": motion_prompt,
+        "suggestion": "You can also use external tools like Runway ML or Pika Labs to animate this image with the motion prompt provided."
+    }
+
+
+def _animation_error(error: Exception, image_path: str, motion_prompt: str, duration_seconds: int) -> dict:
+    """Build the animate_image result for a failed request."""
+    error_msg = str(error)
+    logger.error("❌ Animation error: %s", error_msg)
+    
+    # Check if it's a model availability issue
+    if "not found" in error_msg.lower() or "invalid" in error_msg.lower():
+        return {
+            "status": "model_unavailable",
+            "message": "Video generation model is not available in your region/account. Try using an external tool.",
+            "source_image": image_path,
+            "motion_prompt": motion_prompt,
+            "alternatives": [
+                "Runway ML (runwayml.com) - Image to Video",
+                "Pika Labs (pika.art) - Motion generation",
+                "Kaiber AI - Image animation",
+                "LeiaPix - 3D depth animation"
+            ],
+            "export_data": {
+                "image_path": image_path,
+                "motion_instructions": motion_prompt,
+                "duration": f"{duration_seconds} seconds"
+            }
+        }
+    
+    return _format_error(error)
 
 
-def animate_image(
+async def animate_image(
     image_path: str,
     motion_prompt: str,
     duration_seconds: int = 5,
@@ -538,122 +1269,38 @@ def animate_image(
     - "Make the logo pulse subtly"
     - "Add floating hearts/confetti for Valentine's theme"
     """
-    print(f"🎬 animate_image called:")
-    print(f"   - image_path: {image_path}")
-    print(f"   - motion_prompt: {motion_prompt}")
-    print(f"   - duration: {duration_seconds}s")
+    logger.info(
+        "🎬 animate_image called:\n"
+        "   - image_path: %s\n"
+        "   - motion_prompt: %s\n"
+        "   - duration: %ss",
+        image_path, motion_prompt, duration_seconds
+    )
     
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found. Set GEMINI_API_KEY environment variable."}
     
     if not os.path.exists(image_path):
         return {"status": "error", "message": f"Image not found: {image_path}"}
     
-    client = genai.Client(api_key=api_key)
-    
     # Build the animation prompt
-    animation_prompt = f"""Create a short, looping video animation based on this image.
-
-MOTION INSTRUCTIONS:
-{motion_prompt}
-
-ANIMATION GUIDELINES:
-- Duration: {duration_seconds} seconds
-- Create smooth, seamless motion that loops well
-- Maintain the original image quality and composition
-- Keep brand elements (logo, text) stable and clear
-- Add subtle, professional motion that enhances engagement
-- Suitable for Instagram Reels/Stories format
-
-MOTION STYLE:
-- Cinemagraph-style: Only specific elements should move
-- Keep the overall composition stable
-- Avoid jarring or distracting motion
-- Aim for premium, polished feel
-
-OUTPUT: A high-quality MP4 video that makes this static post come alive."""
+    animation_prompt = _build_animation_prompt(motion_prompt, duration_seconds)
+    video_model = gemini.VIDEO_MODEL
 
     try:
-        # Try using Veo model for video generation
-        video_model = os.getenv("VIDEO_MODEL", "veo-2.0-generate-001")
-        
-        # Load the source image
-        source_image = Image.open(image_path)
+        source_image = await _in_image_pool(_load_upload, image_path, None)
         
-        # Try video generation
-        response = client.models.generate_content(
+        response = await _retry_with_backoff(lambda: client.aio.models.generate_content(
             model=video_model,
             contents=[animation_prompt, source_image],
             config=types.GenerateContentConfig(
                 response_modalities=["video"],
             )
-        )
-        
-        # Create output directory
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        # Process response and save video
-        for part in response.candidates[0].content.parts:
-            if part.inline_data is not None and "video" in part.inline_data.mime_type:
-                video_id = str(uuid.uuid4())[:8]
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"animated_{timestamp}_{video_id}.mp4"
-                video_path = output_path / filename
-                
-                # Save the video
-                with open(video_path, "wb") as f:
-                    f.write(part.inline_data.data)
-                
-                print(f"✅ Video saved: {video_path}")
-                
-                return {
-                    "status": "success",
-                    "video_path": str(video_path),
-                    "filename": filename,
-                    "url": f"/generated/{filename}",
-                    "motion_prompt": motion_prompt,
-                    "duration_seconds": duration_seconds,
-                    "source_image": image_path,
-                    "model": video_model,
-                    "type": "video"
-                }
-        
-        # If video generation not available, try alternative approach
-        # Using image model with motion simulation
-        print("⚠️ Video model response empty, trying alternative approach...")
+        ), track_latency=False)
         
-        return {
-            "status": "partial",
-            "message": "Video generation is being processed. The animated version will be available shortly.",
-            "source_image": image_path,
-            "motion_prompt": motion_prompt,
-            "suggestion": "You can also use external tools like Runway ML or Pika Labs to animate this image with the motion prompt provided."
-        }
+        saved = await _in_image_pool(_save_inline_data, response, output_dir, "animated", "mp4", "video")
+        return _animation_result(saved, image_path, motion_prompt, duration_seconds, video_model)
             
     except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Animation error: {error_msg}")
-        
-        # Check if it's a model availability issue
-        if "not found" in error_msg.lower() or "invalid" in error_msg.lower():
-            return {
-                "status": "model_unavailable",
-                "message": "Video generation model is not available in your region/account. Try using an external tool.",
-                "source_image": image_path,
-                "motion_prompt": motion_prompt,
-                "alternatives": [
-                    "Runway ML (runwayml.com) - Image to Video",
-                    "Pika Labs (pika.art) - Motion generation",
-                    "Kaiber AI - Image animation",
-                    "LeiaPix - 3D depth animation"
-                ],
-                "export_data": {
-                    "image_path": image_path,
-                    "motion_instructions": motion_prompt,
-                    "duration": f"{duration_seconds} seconds"
-                }
-            }
-        
-        return {"status": "error", "message": error_msg}
+        return _animation_error(e, image_path, motion_prompt, duration_seconds)
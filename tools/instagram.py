@@ -101,6 +101,8 @@ def get_profile_summary(username: str) -> str:
     data = profile_data.get("profile_data", {})
     voice = profile_data.get("brand_voice", {})
     content = profile_data.get("content_analysis", {})
+    # Joined outside the f-string: expressions there can't contain a backslash on Python 3.10
+    top_content = "\n".join(f"- {c}" for c in content.get('top_performing_content', ['N/A']))
     
     summary = f"""
 📊 **Profile Summary for @{data.get('username', 'unknown')}**
@@ -123,7 +125,7 @@ def get_profile_summary(username: str) -> str:
 - Emoji Usage: {voice.get('emoji_usage', 'N/A')}
 
 **Top Content Types:**
-{chr(10).join(['- ' + c for c in content.get('top_performing_content', ['N/A'])])}
+{top_content}
 """.strip()
     
     return summary
@@ -0,0 +1,59 @@
+"""Fast local intent pre-classification for incoming user messages."""
+
+import re
+
+SINGLE_POST = "single_post"
+CAMPAIGN = "campaign"
+
+_MONTHS = (
+    # "may" is only a month when it isn't the verb ("the content for may be different")
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may(?!\s+(?:not|be|have|also|need|want|change|vary|differ)\b)|june?|july?|"
+    r"aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+)
+
+CAMPAIGN_PATTERNS = re.compile(
+    r"\b(?:"
+    r"campaigns?"
+    r"|content\s+(?:calendar|plan)"
+    r"|social\s+media\s+plan"
+    r"|(?:weekly|monthly)\s+(?:posts?|content)"
+    r"|\d+\s+posts?\s+(?:per|a|each|every)\s+week"
+    r"|posts?\s+for\s+(?:the\s+)?next\s+\d+\s+(?:weeks?|months?)"
+    rf"|content\s+for\s+{_MONTHS}"
+    r")\b",
+    re.IGNORECASE,
+)
+
+# A request for one new post ("Create a Valentine's Day post"); up to three words may
+# describe the post, but a bare "a post" or "post for X" is too common in follow-ups
+SINGLE_POST_PATTERNS = re.compile(
+    r"\b(?:"
+    r"single\s+post"
+    r"|just\s+one\s+post"
+    r"|(?:create|make|design|generate|want|need)\s+(?:me\s+)?(?:a|an|one)\s+(?:[\w'’-]+\s+){0,3}?post"
+    r")\b",
+    re.IGNORECASE,
+)
+
+
+def classify_intent(message: str) -> str:
+    """
+    Pre-classify a user message as a single post or a campaign request.
+    
+    Only unambiguous messages are classified; anything that matches both
+    pattern sets, or neither, is left for the orchestrator to decide.
+    
+    Args:
+        message: Raw user message text
+        
+    Returns:
+        SINGLE_POST, CAMPAIGN, or an empty string when ambiguous
+    """
+    is_campaign = CAMPAIGN_PATTERNS.search(message) is not None
+    is_single = SINGLE_POST_PATTERNS.search(message) is not None
+    
+    if is_campaign and not is_single:
+        return CAMPAIGN
+    if is_single and not is_campaign:
+        return SINGLE_POST
+    return ""
@@ -0,0 +1,477 @@
+"""In-process response cache for Gemini-backed tool functions."""
+
+import copy
+import hashlib
+import inspect
+import json
+import logging
+import math
+import operator
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional
+
+from .client import embed_text, get_client
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: reuse a result generated for a near-identical request (same structural
+# arguments, semantically similar free text) instead of calling the model again
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+# SQLite file that keeps cached results across restarts (empty to disable)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+
+
+def _sizeof(value: Any) -> int:
+    """Rough size in bytes of a cached tool result (its text payload plus overhead)."""
+    size = 256
+    if isinstance(value, dict):
+        for item in value.values():
+            if isinstance(item, str):
+                size += len(item)
+            elif isinstance(item, (list, tuple)):
+                size += sum(len(v) for v in item if isinstance(v, str))
+    return size
+
+
+def _dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON; sort_keys makes equal values serialize identically for hashing."""
+    return json.dumps(
+        value, separators=(",", ":"), sort_keys=sort_keys, ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+class DiskCache:
+    """SQLite-backed store so cached tool results survive process restarts."""
+    
+    # Bump when the row format changes; older tables are dropped on open
+    SCHEMA_VERSION = 3
+    
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS llm_cache")
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key BLOB PRIMARY KEY, func_name TEXT, arguments BLOB, "
+            "expires_at REAL, stored_at REAL, value BLOB)"
+        )
+        self._conn.commit()
+        # Row count as of the last prune, plus inserts since (replacements overcount,
+        # which only prunes a little early), so writes don't sort the table each time
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    
+    @staticmethod
+    def _digest(key: Hashable) -> bytes:
+        func_name, day, arguments = key
+        return hashlib.blake2b(_dumps([func_name, day, dict(arguments)], sort_keys=True), digest_size=16).digest()
+    
+    def get(self, key: Hashable) -> Optional[tuple[float, Any]]:
+        """Get (expires_at wall-clock time, value), or None if missing or expired."""
+        digest = self._digest(key)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM llm_cache WHERE key = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[0] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (digest,))
+                self._conn.commit()
+                self._rows -= 1
+                return None
+        # Hits are not written back: recency is tracked by the in-memory LRU in front
+        return row[0], json.loads(row[1])
+    
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        """
+        Store a value, keeping roughly the max_entries most recently stored rows.
+        
+        Once the table is over max_entries the oldest rows are pruned down to 90%
+        of it, so the sort over the table runs about once per max_entries/10 writes.
+        """
+        func_name, _, arguments = key
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self._digest(key),
+                    func_name,
+                    _dumps(dict(arguments)),
+                    expires_at,
+                    time.time(),
+                    _dumps(value),
+                )
+            )
+            self._rows += 1
+            if self._rows > self.max_entries:
+                keep = self.max_entries - self.max_entries // 10
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (keep,)
+                )
+                self._rows = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            self._conn.commit()
+    
+    def invalidate(self, func_name: str, match: dict) -> None:
+        """Drop rows for a tool and/or matching argument values."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, func_name, arguments FROM llm_cache").fetchall()
+            stale = []
+            for digest, name, arguments in rows:
+                if func_name and name != func_name:
+                    continue
+                bound = json.loads(arguments)
+                if all(k in bound and bound[k] == v for k, v in match.items()):
+                    stale.append((digest,))
+            self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+            self._conn.commit()
+            self._rows -= len(stale)
+    
+    def clear(self) -> None:
+        """Drop all rows."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._rows = 0
+
+
+class LLMCache:
+    """
+    Thread-safe LRU cache with per-entry expiry and a memory budget for tool results.
+    
+    With a DiskCache attached, entries are also written through to disk and
+    memory misses fall back to it, so results survive restarts.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk: Optional[DiskCache] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.total_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                self._remove(key)
+        
+        if self.disk is None:
+            return None
+        try:
+            found = self.disk.get(key)
+        except sqlite3.Error as e:
+            logger.warning("⚠️ LLM disk cache read failed: %s", e)
+            return None
+        if found is None:
+            return None
+        expires_at, value = found
+        self._store(key, value, time.monotonic() + (expires_at - time.time()))
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if over either limit."""
+        self._store(key, value, time.monotonic() + self.ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, time.time() + self.ttl)
+            except sqlite3.Error as e:
+                logger.warning("⚠️ LLM disk cache write failed: %s", e)
+    
+    def _store(self, key: Hashable, value: Any, expires_at: float) -> None:
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, value)
+            self.total_bytes += size
+            while len(self._entries) > self.maxsize or self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+    
+    def invalidate(self, func_name: str = "", **match: Any) -> int:
+        """
+        Drop entries for a tool and/or matching argument values.
+        
+        Args:
+            func_name: Only drop entries for this tool (empty for any tool)
+            **match: Argument values an entry must have to be dropped,
+                e.g. invalidate(brand_name="Acme")
+                
+        Returns:
+            Number of in-memory entries dropped
+        """
+        with self._lock:
+            stale = []
+            for key in self._entries:
+                name, _, arguments = key
+                if func_name and name != func_name:
+                    continue
+                bound = dict(arguments)
+                if all(k in bound and bound[k] == v for k, v in match.items()):
+                    stale.append(key)
+            for key in stale:
+                self._remove(key)
+        if self.disk is not None:
+            self.disk.invalidate(func_name, match)
+        return len(stale)
+    
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+    
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _normalize(vector: list[float]) -> tuple[float, ...]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return tuple(x / norm for x in vector)
+
+
+class SemanticCache:
+    """
+    Results grouped by structural skeleton and matched on embedding similarity.
+    
+    Two requests can only share a result if every structural argument (voice,
+    tone, emoji level, ...) is identical; within a skeleton, the free-text
+    arguments are compared by cosine similarity of their embeddings.
+    """
+    
+    def __init__(self, threshold: float = 0.92, per_skeleton: int = 64):
+        self.threshold = threshold
+        self.per_skeleton = per_skeleton
+        self._entries: dict[Hashable, list[tuple[tuple[float, ...], Any]]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, skeleton: Hashable, vector: list[float]) -> Optional[Any]:
+        """Get the most similar stored value above the threshold, or None."""
+        with self._lock:
+            candidates = list(self._entries.get(skeleton, ()))
+        query = _normalize(vector)
+        best, best_score = None, self.threshold
+        for stored, value in candidates:
+            score = sum(map(operator.mul, stored, query))
+            if score >= best_score:
+                best, best_score = value, score
+        return best
+    
+    def set(self, skeleton: Hashable, vector: list[float], value: Any) -> None:
+        """Store a value, dropping the oldest one once the skeleton is full."""
+        with self._lock:
+            entries = self._entries.setdefault(skeleton, [])
+            entries.append((_normalize(vector), value))
+            if len(entries) > self.per_skeleton:
+                del entries[0]
+    
+    def clear(self) -> None:
+        """Drop all stored values."""
+        with self._lock:
+            self._entries.clear()
+
+
+def _open_disk_cache() -> Optional[DiskCache]:
+    """Open the persistent cache file, or run memory-only if it's disabled or unusable."""
+    if not LLM_CACHE_PATH:
+        return None
+    try:
+        return DiskCache(LLM_CACHE_PATH)
+    except sqlite3.Error as e:
+        logger.warning("⚠️ LLM disk cache disabled (%s): %s", LLM_CACHE_PATH, e)
+        return None
+
+
+# Shared caches for all LLM-backed tools
+_llm_cache = LLMCache(disk=_open_disk_cache())
+_semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+
+# Other tool result caches (sharing the disk store) cleared along with _llm_cache
+_registered_caches: list[LLMCache] = []
+
+# Calls currently running, so concurrent identical calls share one LLM request
+_inflight: dict[Hashable, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the shared LLM response cache."""
+    return _llm_cache
+
+
+def register_cache(cache: LLMCache) -> LLMCache:
+    """Have invalidate() and invalidate_all() also clear another tool result cache; returns it."""
+    _registered_caches.append(cache)
+    return cache
+
+
+def invalidate(func_name: str = "", **match: Any) -> int:
+    """Drop cached results matching a tool name and/or argument values, e.g. invalidate(topic="Diwali")."""
+    return sum(cache.invalidate(func_name, **match) for cache in (_llm_cache, *_registered_caches))
+
+
+def invalidate_all() -> None:
+    """Drop every cached LLM result, e.g. after a brand profile changes."""
+    for cache in (_llm_cache, *_registered_caches):
+        cache.clear()
+    _semantic_cache.clear()
+
+
+def cached_llm_call(func: Callable[..., dict]) -> Callable[..., dict]:
+    """
+    Cache successful results of an LLM-backed tool function.
+    
+    Results are keyed on the function name, today's date and the full set of
+    bound arguments (defaults applied), so positional and keyword calls share
+    entries. Only results with status "success" are cached. Identical calls
+    made while one is already running wait for its result instead of sending
+    their own request. A `force` argument is left out of the key: force=True
+    skips the lookup and stores the fresh result in place of the cached one.
+    
+    Args:
+        func: Tool function returning a result dictionary
+        
+    Returns:
+        Wrapped function with the same signature and docstring
+    """
+    signature = inspect.signature(func)
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs) -> dict:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        force = arguments.pop("force", False)
+        # Prompts mention the current date, so entries never outlive the day
+        key = (func.__name__, date.today().isoformat(), tuple(sorted(arguments.items())))
+        
+        if force:
+            result = func(*args, **kwargs)
+            if result.get("status") == "success":
+                _llm_cache.set(key, copy.deepcopy(result))
+            return result
+        
+        cached = _llm_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        with _inflight_lock:
+            pending = _inflight.get(key)
+            if pending is None:
+                pending = _inflight[key] = Future()
+                leader = True
+            else:
+                leader = False
+        
+        if not leader:
+            return copy.deepcopy(pending.result())
+        
+        try:
+            # The previous leader may have finished between our lookup and taking the slot
+            result = _llm_cache.get(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                if result.get("status") == "success":
+                    _llm_cache.set(key, copy.deepcopy(result))
+            pending.set_result(copy.deepcopy(result))
+            return result
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with _inflight_lock:
+                del _inflight[key]
+    
+    return wrapper
+
+
+def semantic_llm_call(varying: tuple[str, ...]) -> Callable:
+    """
+    Reuse results of semantically similar calls to an LLM-backed tool.
+    
+    Every argument not listed in `varying` is structural and must match
+    exactly; the `varying` free-text arguments are embedded and compared.
+    force=True skips the lookup. Does nothing unless SEMANTIC_CACHE=true.
+    
+    Args:
+        varying: Names of the free-text arguments compared by similarity
+        
+    Returns:
+        Decorator for a tool function returning a result dictionary
+    """
+    def decorator(func: Callable[..., dict]) -> Callable[..., dict]:
+        if not SEMANTIC_CACHE_ENABLED:
+            return func
+        
+        signature = inspect.signature(func)
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> dict:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            force = bound.arguments.get("force", False)
+            structural = tuple(sorted(
+                (name, value) for name, value in bound.arguments.items()
+                if name not in varying and name != "force"
+            ))
+            skeleton = (func.__name__, date.today().isoformat(), structural)
+            text = "\n".join(f"{name}: {bound.arguments[name]}" for name in varying)
+            
+            client = get_client()
+            vector = None
+            if client is not None:
+                try:
+                    vector = embed_text(client, text)
+                except Exception as e:
+                    logger.warning("⚠️ Semantic cache lookup skipped: %s", e)
+            
+            if vector is not None and not force:
+                cached = _semantic_cache.get(skeleton, vector)
+                if cached is not None:
+                    return copy.deepcopy(cached)
+            
+            result = func(*args, **kwargs)
+            if vector is not None and result.get("status") == "success":
+                _semantic_cache.set(skeleton, vector, copy.deepcopy(result))
+            return result
+        
+        return wrapper
+    
+    return decorator
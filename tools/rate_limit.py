@@ -0,0 +1,155 @@
+"""Client-side rate limiting for Gemini requests."""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket that spaces requests out to stay under a requests-per-minute quota.
+
+    Callers take a token before each request and wait when the bucket is empty,
+    instead of finding the limit by getting a 429 back. The bucket adapts: a 429
+    that slips through halves the refill rate and pauses every caller for the
+    quota wait, and each success afterwards wins back a tenth of the full rate.
+    Safe to share between threads and event loops.
+    """
+
+    def __init__(self, rpm: int, min_scale: float = 0.125):
+        self.capacity = float(rpm)
+        self.rate = rpm / 60.0
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long to wait before it may be used."""
+        with self._lock:
+            now = time.monotonic()
+            pause = max(0.0, self.paused_until - now)
+            if self.rate <= 0:
+                return pause
+            rate = self.rate * self.scale
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            # Tokens may go negative: each waiter reserves its slot in the queue
+            self.tokens -= 1
+            return pause + (0.0 if self.tokens >= 0 else -self.tokens / rate)
+
+    async def acquire_async(self) -> None:
+        """Wait until a request may be sent, without blocking the event loop."""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def throttled(self, pause: float = 0.0) -> None:
+        """
+        The server rate-limited us anyway: halve the refill rate.
+
+        Args:
+            pause: Seconds every caller should hold off before the next request
+        """
+        with self._lock:
+            self.scale = max(self.min_scale, self.scale / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def succeeded(self) -> None:
+        """A request went through: recover towards the full rate."""
+        if self.scale < 1.0:
+            with self._lock:
+                self.scale = min(1.0, self.scale + 0.1)
+
+
+class ConcurrencyLimit:
+    """
+    Adaptive cap on requests in flight, adjusted AIMD-style.
+
+    Each request that completes while recent latency is on target raises the
+    cap by `increase`; server pushback (429, 5xx, timeouts), or the average of
+    the last `window` latencies drifting over target, multiplies it by
+    `decrease`. Requests over the cap wait their turn in arrival order.
+    Safe to share between threads and event loops.
+    """
+
+    def __init__(
+        self,
+        max_limit: int = 8,
+        min_limit: int = 1,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        target_latency: float = 30.0,
+        window: int = 16
+    ):
+        # A cap below one slot would leave every acquire() waiting forever
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self._waiters: deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a free slot; every acquire must be paired with a release()."""
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            # A slot handed over just before the cancel has to go back (_grant does it if it hasn't run)
+            if not queued and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """
+        Give back a slot and adapt the cap to how the request went.
+
+        Args:
+            latency: Seconds a successful request took (None for failures)
+            overloaded: The server pushed back, e.g. with a 429 or 5xx
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if overloaded:
+                self._back_off()
+            elif latency is not None:
+                self.latencies.append(latency)
+                full = len(self.latencies) == self.latencies.maxlen
+                if full and sum(self.latencies) / len(self.latencies) > self.target_latency:
+                    self._back_off()
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + self.increase)
+            # Hand freed slots straight to waiters so a new arrival can't overtake them
+            while self._waiters and self.in_flight < int(self.limit):
+                waiter = self._waiters.popleft()
+                self.in_flight += 1
+                waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+
+    def _back_off(self) -> None:
+        self.limit = max(float(self.min_limit), self.limit * self.decrease)
+        # Judge the new cap on fresh latencies only
+        self.latencies.clear()
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            self.release()
+        else:
+            waiter.set_result(None)
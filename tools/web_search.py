@@ -1,13 +1,9 @@
 """Web search tools using Gemini for trend research."""
 
-import os
 from datetime import datetime
 from typing import Any
 
-from google import genai
-from dotenv import load_dotenv
-
-load_dotenv()
+from .client import generate_text, get_client
 
 
 def search_web(query: str, context: str = "") -> dict:
@@ -21,12 +17,10 @@ def search_web(query: str, context: str = "") -> dict:
     Returns:
         Dictionary with search results
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
     prompt = f"""As a research assistant, provide comprehensive information about:
 
 Query: {query}
@@ -37,14 +31,11 @@ Provide accurate, up-to-date information that would be useful for social media c
 Include relevant facts, trends, and insights."""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        text = generate_text(client, prompt)
         return {
             "status": "success",
             "query": query,
-            "results": response.text.strip(),
+            "results": text,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -67,12 +58,10 @@ def search_trending_topics(
     Returns:
         Dictionary with trending topics analysis
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
     prompt = f"""As a social media trend analyst, identify current trending topics for {platform} in the {niche} niche.
 
 Region: {region}
@@ -88,16 +77,13 @@ Provide:
 Be specific, actionable, and focused on what would work for content creators."""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        text = generate_text(client, prompt)
         return {
             "status": "success",
             "niche": niche,
             "region": region,
             "platform": platform,
-            "trends_analysis": response.text.strip(),
+            "trends_analysis": text,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -118,12 +104,10 @@ def get_competitor_insights(
     Returns:
         Dictionary with competitor analysis
     """
-    api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+    client = get_client()
+    if client is None:
         return {"status": "error", "message": "No API key found"}
     
-    client = genai.Client(api_key=api_key)
-    
     handles_str = competitor_handles
     
     prompt = f"""As a social media strategist, provide insights about these {platform} accounts: {handles_str}
@@ -138,15 +122,12 @@ For each competitor, analyze (based on typical patterns for such accounts):
 Provide actionable insights for someone competing in the same space."""
 
     try:
-        response = client.models.generate_content(
-            model=os.getenv("DEFAULT_MODEL", "gemini-2.5-flash"),
-            contents=prompt
-        )
+        text = generate_text(client, prompt)
         return {
             "status": "success",
             "competitors": competitor_handles,
             "platform": platform,
-            "insights": response.text.strip()
+            "insights": text
         }
     except Exception as e:
         return {"status": "error", "message": str(e)}